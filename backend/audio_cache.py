@@ -0,0 +1,191 @@
+"""
+Content-addressed cache of synthesized phrases.
+
+Keyed by (voice, normalized text, pipeline version), so a voice change or a
+Kokoro upgrade never replays stale audio. Audio is held as PCM16 in an
+in-memory LRU bounded by bytes, and optionally in a directory of .npy
+files that are memory-mapped on read and survive restarts. Only short
+phrases are cached, and a phrase goes to disk only once it has been said
+twice, or when pre-warmed, so ordinary sentences never cost an SD-card write.
+
+Pre-warm the disk store at install time:
+
+    python backend/audio_cache.py elysia_introduction.txt --text "Goodbye!"
+"""
+import argparse
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+import metrics
+from playback import to_float32, to_pcm16
+
+MAX_DISK_BYTES = 256 << 20
+
+
+def normalize(text: str) -> str:
+    # case and punctuation change the prosody, so only whitespace is folded
+    return " ".join(text.split())
+
+
+class PhraseCache:
+    def __init__(self, max_bytes: int = 16 << 20, disk_dir: str = "", max_chars: int = 40,
+                 max_disk_bytes: int = MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_chars = max_chars
+        self.max_disk_bytes = max_disk_bytes
+        self._lru: OrderedDict = OrderedDict()  # key -> int16 array (or memmap)
+        self._bytes = 0
+        self._disk: OrderedDict = OrderedDict()  # key -> file size, oldest first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+        self._outcomes = {k: metrics.counter("phrase_cache_lookups", "Phrase audio cache lookups by outcome",
+                                             {"outcome": k})
+                          for k in ("memory", "disk", "miss")}
+
+    def accepts(self, text: str) -> bool:
+        return 0 < len(text) <= self.max_chars
+
+    @staticmethod
+    def key(voice: str, text: str, version: str) -> str:
+        return hashlib.sha1(f"{voice}\0{normalize(text)}\0{version}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """The cached phrase as float32, or None."""
+        with self._lock:
+            samples = self._lru.get(key)
+            if samples is not None:
+                self._lru.move_to_end(key)
+                repeat = bool(self.disk_dir) and key not in self._disk
+        if samples is not None:
+            self._outcomes["memory"].inc()
+            if repeat:
+                self._save(key, samples)  # said twice: worth keeping across restarts
+            return to_float32(samples)
+        samples = self._load(key)
+        if samples is None:
+            self._outcomes["miss"].inc()
+            return None
+        with self._lock:
+            self._remember(key, samples)
+        self._outcomes["disk"].inc()
+        return to_float32(samples)
+
+    def put(self, key: str, chunks: List[np.ndarray], persist: bool = False):
+        """Cache in memory; persist writes it to disk right away (pre-warming)."""
+        if not chunks:
+            return
+        samples = to_pcm16(np.concatenate([to_float32(c) for c in chunks]))
+        with self._lock:
+            self._remember(key, samples)
+        if persist and self.disk_dir:
+            self._save(key, samples)
+
+    def _remember(self, key: str, samples: np.ndarray):
+        old = self._lru.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._lru[key] = samples
+        self._bytes += samples.nbytes
+        while self._bytes > self.max_bytes and len(self._lru) > 1:
+            _, evicted = self._lru.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + ".npy")
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        if not self.disk_dir:
+            return None
+        with self._lock:
+            if key not in self._disk:
+                return None
+            self._disk.move_to_end(key)
+        try:
+            return np.load(self._path(key), mmap_mode="r")  # pages in as it plays, not up front
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key: str, samples: np.ndarray):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, samples)
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[audio_cache] could not write {path}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            evicted = []
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                old, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def _scan_disk(self):
+        """Index the disk store once, oldest first; from then on it is tracked in memory."""
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for e in it:
+                if e.name.endswith(".npy"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, e.name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+
+def prewarm(texts: Iterable[str]) -> int:
+    """Synthesize each short sentence of `texts` into the phrase cache's disk store; returns the count."""
+    import tts
+    from main import clean_for_tts
+    from segmenter import SentenceSegmenter
+
+    tts.load()
+    cache = tts._phrase_cache()
+    count = 0
+    for text in texts:
+        segmenter = SentenceSegmenter()
+        for sentence in segmenter.feed(text) + segmenter.flush():
+            msg = clean_for_tts(sentence)
+            if msg and cache is not None and cache.accepts(msg):
+                for _ in tts.generate_audio_chunks(msg, persist=True):
+                    pass
+                count += 1
+    return count
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pre-synthesize phrases into the on-disk audio cache.")
+    ap.add_argument("files", nargs="*", help="text files; every sentence is cached")
+    ap.add_argument("--text", action="append", default=[], help="a phrase to cache (repeatable)")
+    args = ap.parse_args()
+    texts = list(args.text)
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    import settings
+    if not settings.current().phrase_cache_dir:
+        raise SystemExit("phrase_cache_dir is empty in config.json; nothing would persist")
+    print(f"cached {prewarm(texts)} phrase(s) in {settings.resolve_path(settings.current().phrase_cache_dir)}")
+
+
+if __name__ == "__main__":
+    main()
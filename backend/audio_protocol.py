@@ -0,0 +1,57 @@
+"""
+Binary websocket frames for TTS audio (JSON stays for state events).
+
+Every frame is a 16-byte little-endian header followed by the payload:
+
+    magic    4s   b"ELYA"
+    version  u8   1
+    kind     u8   KIND_AUDIO
+    fmt      u8   FMT_PCM16 (int16 samples) | FMT_FLOAT32
+    flags    u8   FLAG_START on the first chunk of a sentence
+    seq      u32  per-stream sequence number, for gap detection
+    rate     u32  sample rate in Hz
+
+Mono audio; the payload is the raw samples in the given format.
+
+KIND_ENVELOPE frames reuse the header for the precomputed lip-sync
+envelope of the audio chunk with the same seq (see envelope.py):
+fmt is the row width (1 + band count), rate is rows per second, and the
+payload is uint8 rows of [rms, band_0 .. band_n], 0..255 over 60 dB.
+They are sent just before their audio frame.
+
+Only struct is imported up front; the websocket handler needs the format
+constants long before the first frame is encoded.
+"""
+import struct
+
+MAGIC = b"ELYA"
+VERSION = 1
+KIND_AUDIO = 1
+KIND_ENVELOPE = 2
+FMT_PCM16 = 1
+FMT_FLOAT32 = 2
+FLAG_START = 1
+
+HEADER = struct.Struct("<4sBBBBII")
+FORMATS = {"pcm16": FMT_PCM16, "float32": FMT_FLOAT32}
+
+
+def encode_audio(chunk, seq: int, sample_rate: int, fmt: int = FMT_PCM16, flags: int = 0) -> bytes:
+    import numpy as np
+    from playback import to_pcm16
+    if fmt == FMT_PCM16:
+        payload = to_pcm16(chunk).tobytes()
+    else:
+        payload = np.asarray(chunk, dtype=np.float32).tobytes()
+    return HEADER.pack(MAGIC, VERSION, KIND_AUDIO, fmt, flags, seq & 0xFFFFFFFF, sample_rate) + payload
+
+
+def encode_envelope(rows, seq: int, rows_per_s: int) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, KIND_ENVELOPE, rows.shape[1], 0, seq & 0xFFFFFFFF, rows_per_s) + rows.tobytes()
+
+
+def decode_header(frame: bytes) -> dict:
+    magic, version, kind, fmt, flags, seq, rate = HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise ValueError("not an Elysia binary frame")
+    return {"version": version, "kind": kind, "fmt": fmt, "flags": flags, "seq": seq, "rate": rate}
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Callable, Iterable, List, Optional
+
+_END = object()
+
+
+class Utterance:
+    """Speech that is already rendered: text plus its audio chunks, replayed without synthesis."""
+
+    def __init__(self, text: str, chunks: List):
+        self.text = text
+        self.chunks = chunks
+
+
+class ChunkStream:
+    """
+    Async iterator over a blocking chunk generator (tts.generate_audio_chunks)
+    that runs on a worker thread. Chunks cross to the event loop through a
+    bounded asyncio.Queue: the worker blocks once maxsize chunks are waiting,
+    so synthesis never runs unboundedly ahead of delivery, and the loop only
+    ever does a non-blocking get.
+    """
+
+    def __init__(self, source: Callable[[], Iterable], maxsize: int = 4):
+        self._source = source
+        self._slots = threading.Semaphore(maxsize)
+        self._cancelled = threading.Event()
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.started_at = 0.0
+        self.first_chunk_at = 0.0   # perf_counter when the first chunk was ready
+        self.done_at = 0.0
+
+    def start(self, executor: Optional[Executor] = None):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self.started_at = time.perf_counter()
+        if executor is not None:
+            executor.submit(self._produce)
+        else:
+            threading.Thread(target=self._produce, name="tts-stream", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+        self._slots.release()  # unblock a worker waiting for room
+
+    def _put(self, item):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def _produce(self):
+        gen = None
+        try:
+            if self._cancelled.is_set():
+                return
+            gen = self._source()
+            for chunk in gen:
+                if not self.first_chunk_at:
+                    self.first_chunk_at = time.perf_counter()
+                self._slots.acquire()
+                if self._cancelled.is_set():
+                    break
+                self._put(chunk)
+        except Exception as e:
+            self._put(e)
+        finally:
+            close = getattr(gen, "close", None)
+            if close is not None:
+                close()
+            self.done_at = time.perf_counter()
+            self._put(_END)
+
+    async def __aiter__(self):
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            self._slots.release()
+            yield item
@@ -0,0 +1,79 @@
+"""
+Event-loop cost per token of the LLM streaming bridge.
+
+Compares the old per-token run_in_executor/wait_for bridge with llm.TokenStream
+against a fake token server (a thread yielding ollama-shaped chunks at a fixed
+rate). Loop overhead is the CPU time the event-loop thread spends per token.
+
+    python bench_llm_stream.py --tokens 2000 --rate 0
+    python bench_llm_stream.py --tokens 300 --rate 20
+"""
+import argparse
+import asyncio
+import time
+
+from llm import TokenStream, token_text
+
+
+def fake_token_server(n: int, rate: float):
+    """Yield n ollama-style chunks; rate is tokens/s (0 = as fast as possible)."""
+    delay = 1.0 / rate if rate > 0 else 0.0
+    for i in range(n):
+        if delay:
+            time.sleep(delay)
+        yield {"response": f"tok{i} ", "done": False}
+    yield {"response": "", "done": True}
+
+
+async def legacy_bridge(gen, timeout_s: float):
+    # verbatim copy of the pre-TokenStream main._aiter_with_timeout
+    loop = asyncio.get_event_loop()
+    it = iter(gen)
+    while True:
+        try:
+            yield await asyncio.wait_for(loop.run_in_executor(None, next, it), timeout=timeout_s)
+        except asyncio.TimeoutError:
+            break
+        except StopIteration:
+            break
+
+
+async def run_legacy(n: int, rate: float):
+    # The legacy bridge never sees StopIteration (it cannot cross a Future) and
+    # only ends on its timeout, so stop the clock at the last token.
+    async for chunk in legacy_bridge(fake_token_server(n, rate), 1):
+        if token_text(chunk):
+            yield
+
+
+async def run_stream(n: int, rate: float):
+    async for _ in TokenStream(lambda: fake_token_server(n, rate)):
+        yield
+
+
+async def measure(name: str, fn, n: int, rate: float):
+    count = 0
+    cpu = wall = 0.0
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    async for _ in fn(n, rate):
+        count += 1
+        if count <= n:  # clock stops at the last token, however the stream ends
+            cpu = time.thread_time() - cpu0
+            wall = time.perf_counter() - wall0
+    print(f"{name:>12}: {count} tokens  wall {wall * 1000:8.1f} ms  "
+          f"loop cpu {cpu * 1000:8.1f} ms  ({cpu / max(count, 1) * 1e6:7.1f} us/token)")
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", type=int, default=2000)
+    ap.add_argument("--rate", type=float, default=0, help="tokens/s, 0 = unthrottled")
+    args = ap.parse_args()
+    # silence the "StopIteration cannot be raised into a Future" callback noise
+    asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: None)
+    await measure("legacy", run_legacy, args.tokens, args.rate)
+    await measure("TokenStream", run_stream, args.tokens, args.rate)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,303 @@
+"""
+End-to-end turn latency of the real pipeline, without a microphone, GPU or network.
+
+handle_interaction() runs unchanged against:
+  - a fake Ollama (an HTTP server on a local thread) that streams the scripted
+    reply to the latest transcript in the prompt word by word at --rate tokens/s
+    after --prefill-ms, tool_code blocks included, so tool calls go through the
+    real tool layer;
+  - scripted transcripts in place of stt.listen;
+  - a stub TTS producing silence at --tts-rtf (or the real Kokoro with --tts real);
+  - a real-time NullSink audio player;
+  - a throwaway workspace and config built from the Settings defaults, so the
+    results don't depend on the local config.json.
+
+It reports time to first audio, turn latency and every other timeline mark
+(p50/p95), the token rate the pipeline sustained against what the server sent,
+and event-loop lag. The first --warmup turns are left out. With --response-cache
+repeated questions replay from the cache and the hit count is reported.
+
+    python bench_pipeline.py
+    python bench_pipeline.py --repeat 5 --rate 60 --json bench.json --max-ttfa-ms 600
+    python bench_pipeline.py --response-cache
+    python bench_pipeline.py --script turns.json   # [{"transcript": ..., "reply": ...}, ...]
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT = [
+    {"transcript": "what time is it",
+     "reply": "It's a little past noon. Is there anything else I can help you with?"},
+    {"transcript": "what is in my workspace",
+     "reply": "Let me take a look.\n```tool_code\nlist_dir()\n```\nThose are the files I can see right now."},
+    {"transcript": "tell me a short story",
+     "reply": "Once upon a time there was a lighthouse keeper. Every night she climbed the stairs and lit "
+              "the lamp. One stormy night a ship answered with a light of its own. They have been friends "
+              "ever since."},
+    {"transcript": "read my notes",
+     "reply": "Sure.\n```tool_code\nread_file(\"notes.txt\")\n```\nThat's everything in your notes."},
+    {"transcript": "thank you",
+     "reply": "You're welcome!"},
+]
+
+BENCH_SETTINGS = {
+    "phone_home": False,
+    "local_memory": False,
+    "response_cache": False,
+    "barge_in": False,
+    "phrase_cache_mb": 0.0,
+    "phrase_cache_dir": "",
+    "timeline_log": "",
+    "profile_every_n": 0,
+    "profile_slow_ms": 0,
+    "metrics_port": 0,
+}
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """Answers /api/generate with the scripted reply, streamed as ollama NDJSON."""
+
+    daemon_threads = True
+
+    def __init__(self, script, rate: float, prefill_ms: float):
+        super().__init__(("127.0.0.1", 0), _OllamaHandler)
+        self.script = list(script)
+        self.rate = rate
+        self.prefill_ms = prefill_ms
+        self.streams = []  # (tokens, first token sent, last token sent) per generate
+
+    def reply_for(self, prompt: str) -> str:
+        # the prompt carries the scratchpad too; the turn being asked is the latest transcript in it
+        pos, reply = max((prompt.rfind(t["transcript"]), t["reply"]) for t in self.script)
+        return reply if pos >= 0 else "I have nothing scripted for that."
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        server = self.server
+        prompt = body.get("prompt", "")
+        if not prompt:  # warm-up: load only
+            self._send({"done": True})
+            return
+        tokens = re.findall(r"\s*\S+", server.reply_for(prompt))
+        delay = 1.0 / server.rate if server.rate > 0 else 0.0
+        time.sleep(server.prefill_ms / 1000)
+        first = last = time.perf_counter()
+        next_t = first
+        for i, token in enumerate(tokens):
+            if i and delay:
+                next_t += delay
+                time.sleep(max(0.0, next_t - time.perf_counter()))
+            last = time.perf_counter()
+            if i == 0:
+                first = last
+            try:
+                self._send({"response": token, "done": False})
+            except OSError:
+                return  # client cancelled
+        server.streams.append((len(tokens), first, last))
+        context = (body.get("context") or []) + list(range(len(tokens)))
+        self._send({"response": "", "done": True, "context": context,
+                    "prompt_eval_count": len(prompt) // 4,
+                    "prompt_eval_duration": int(server.prefill_ms * 1e6)})
+
+    def _send(self, part: dict):
+        self.wfile.write((json.dumps(part) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+def stub_tts(sample_rate: int, rtf: float, chars_per_s: float = 15.0, chunk_s: float = 0.5):
+    """A generate_audio_chunks stand-in: silence as long as the text would take to say, at rtf."""
+    import numpy as np
+
+    def generate_audio_chunks(text: str):
+        remaining = max(len(text) / chars_per_s, chunk_s)
+        while remaining > 0:
+            length = min(chunk_s, remaining)
+            time.sleep(length * rtf)
+            yield np.zeros(int(length * sample_rate), dtype=np.float32)
+            remaining -= length
+
+    return generate_audio_chunks
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)  # nearest rank, as timeline.percentiles
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+
+def configure(workdir: str, **overrides) -> str:
+    """Point settings at a config of Settings defaults plus BENCH_SETTINGS (and overrides); returns its path."""
+    import settings
+    values = dataclasses.asdict(settings.Settings())
+    values.update(BENCH_SETTINGS, **overrides)
+    path = os.path.join(workdir, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(values, f)
+    settings.CONFIG_PATH = path
+    settings.reload(force=True)
+    return path
+
+
+async def run(args, script) -> dict:
+    import main
+    import stt
+    import timeline
+    import tts
+    from executors import InstrumentedExecutor
+    from loopwatch import LoopMonitor
+    from playback import AudioPlayer, NullSink
+
+    total = len(script) * args.repeat
+    measured = total - args.warmup
+    timeline.configure("", window=measured)
+    turns = [t["transcript"] for t in script] * args.repeat
+    server = FakeOllama(script, args.rate, args.prefill_ms)
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    os.environ["OLLAMA_HOST"] = f"127.0.0.1:{server.server_address[1]}"
+
+    if args.tts == "real":
+        tts.load()
+    else:
+        main.generate_audio_chunks = stub_tts(tts.SAMPLE_RATE, args.tts_rtf)
+
+    def listen(preroll: bytes = b""):
+        stt.last_speech_end = time.perf_counter()
+        return turns.pop(0) if turns else "bye"
+
+    main.listen = listen
+    asyncio.get_running_loop().set_default_executor(InstrumentedExecutor("default"))
+    monitor = LoopMonitor(args.lag_threshold_ms / 1000).start()
+    player = main.audio_player = AudioPlayer(NullSink(), tts.SAMPLE_RATE).start()
+    speaker = asyncio.create_task(main.speaker_task(player))
+    started = time.perf_counter()
+    try:
+        await main.handle_interaction()
+    finally:
+        wall = time.perf_counter() - started
+        await main.speech_queue.put(None)
+        await speaker
+        monitor.stop()
+        player.stop()
+        server.shutdown()
+
+    # per-turn token windows: server side (first to last token sent) against the
+    # pipeline's (first token to generation_done), for the measured turns that
+    # generated (cache hits don't reach the server)
+    recent = list(timeline.recent)
+    generated = [turn for turn in recent if "first_token" in turn.marks]
+    streams = server.streams[len(server.streams) - len(generated):] if generated else []
+    sent = received = 0.0
+    tokens = 0
+    for (n, first, last), turn in zip(streams, generated):
+        marks = turn.marks
+        if n > 1 and "first_token" in marks and "generation_done" in marks:
+            tokens += n - 1
+            sent += last - first
+            received += marks["generation_done"] - marks["first_token"]
+    server_rate = tokens / sent if sent else 0.0
+    pipeline_rate = tokens / received if received else 0.0
+    lags = list(monitor.lags)
+    lookups = [turn.info["response_cache"] for turn in recent if "response_cache" in turn.info]
+    return {
+        "turns": measured,
+        "wall_s": round(wall, 2),
+        "params": {"rate": args.rate, "prefill_ms": args.prefill_ms, "tts": args.tts,
+                   "tts_rtf": args.tts_rtf, "repeat": args.repeat, "warmup": args.warmup,
+                   "response_cache": args.response_cache},
+        "marks_ms": timeline.percentiles(),
+        "tokens": {
+            "server_tok_s": round(server_rate, 2),
+            "pipeline_tok_s": round(pipeline_rate, 2),
+            "overhead_pct": round((1 - pipeline_rate / server_rate) * 100, 2) if server_rate else 0.0,
+            "overhead_us_per_token": round((received - sent) / tokens * 1e6, 1) if tokens else 0.0,
+        },
+        "response_cache": {"lookups": len(lookups), "hits": lookups.count("hit")},
+        "loop_lag_ms": {
+            "p50": round(_percentile(lags, 0.50) * 1000, 2),
+            "p95": round(_percentile(lags, 0.95) * 1000, 2),
+            "max": round(max(lags, default=0.0) * 1000, 2),
+            "n": len(lags),
+        },
+    }
+
+
+def report(result: dict):
+    p = result["params"]
+    print(f"\n{result['turns']} turns in {result['wall_s']}s  (rate {p['rate']} tok/s, prefill {p['prefill_ms']}ms, "
+          f"tts {p['tts']}{'' if p['tts'] == 'real' else ' rtf ' + str(p['tts_rtf'])})")
+    print(f"  {'mark':<22}{'p50 ms':>10}{'p95 ms':>10}{'n':>6}")
+    for name, s in sorted(result["marks_ms"].items(), key=lambda kv: kv[1]["p50"]):
+        print(f"  {name:<22}{s['p50']:>10.0f}{s['p95']:>10.0f}{s['n']:>6}")
+    t = result["tokens"]
+    print(f"  tokens: server {t['server_tok_s']} tok/s, pipeline {t['pipeline_tok_s']} tok/s, "
+          f"overhead {t['overhead_pct']}% ({t['overhead_us_per_token']} us/token)")
+    cache = result["response_cache"]
+    if cache["lookups"]:
+        print(f"  response cache: {cache['hits']}/{cache['lookups']} hits")
+    lag = result["loop_lag_ms"]
+    print(f"  loop lag: p50 {lag['p50']}ms  p95 {lag['p95']}ms  max {lag['max']}ms  ({lag['n']} beats)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Deterministic end-to-end latency benchmark of the turn pipeline.")
+    ap.add_argument("--script", help="JSON list of {transcript, reply}; default is a built-in 5-turn script")
+    ap.add_argument("--repeat", type=int, default=2, help="run the script this many times")
+    ap.add_argument("--warmup", type=int, default=1, help="leading turns left out of the results")
+    ap.add_argument("--rate", type=float, default=40.0, help="fake LLM tokens/s (0 = unthrottled)")
+    ap.add_argument("--prefill-ms", type=float, default=150.0, help="fake LLM delay before the first token")
+    ap.add_argument("--tts", choices=("stub", "real"), default="stub")
+    ap.add_argument("--tts-rtf", type=float, default=0.05, help="stub synthesis time per second of audio")
+    ap.add_argument("--response-cache", action="store_true", help="enable the response cache (off in the bench config)")
+    ap.add_argument("--lag-threshold-ms", type=float, default=100.0, help="log the loop stack past this lag")
+    ap.add_argument("--json", help="also write the results here")
+    ap.add_argument("--max-ttfa-ms", type=float, default=0.0,
+                    help="exit 1 if p95 time to first audio exceeds this (0 = no gate)")
+    args = ap.parse_args()
+
+    script = SCRIPT
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    if args.warmup >= len(script) * args.repeat:
+        raise SystemExit("--warmup must leave at least one turn to measure")
+
+    workdir = tempfile.mkdtemp(prefix="elysia-bench-")
+    workspace = os.path.join(workdir, "workspace")
+    os.makedirs(workspace)
+    with open(os.path.join(workspace, "notes.txt"), "w", encoding="utf-8") as f:
+        f.write("Buy milk. Call the plumber about the kitchen sink.\n")
+    os.environ["ELYSIA_WORKDIR"] = workspace
+    os.environ["ELYSIA_RESPONSE_CACHE"] = os.path.join(workdir, "response_cache.sqlite")
+    configure(workdir, response_cache=args.response_cache)
+
+    result = asyncio.run(run(args, script))
+    report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    ttfa = result["marks_ms"].get("first_audio_played", {}).get("p95", 0.0)
+    if args.max_ttfa_ms and ttfa > args.max_ttfa_ms:
+        print(f"p95 time to first audio {ttfa:.0f}ms is over the {args.max_ttfa_ms:.0f}ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Behaviour check of the phone-home memory client (external_memory.py) against
+a stand-in endpoint, without the real memory service.
+
+The stand-in is an HTTP server on a local thread, like the fake Ollama in
+bench_pipeline.py, whose answer, status and delay can be changed between
+calls. ExternalMemoryClient runs unchanged against it through:
+
+  - cache hit        a repeated query (case and spacing aside) is not re-fetched
+  - deadline miss    a slow answer returns "" at the deadline, not when it lands
+  - breaker open     after `failures` errors the endpoint is not called at all
+  - half-open        after reset_s one trial call goes through and closes it
+
+    python check_external_memory.py
+
+Exits 1 if any check fails.
+"""
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeMemory(ThreadingHTTPServer):
+    """Answers GET /?query=... with `text` after `delay` seconds, or with `status` if it isn't 200."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _MemoryHandler)
+        self.text = "The user's cat is called Miso."
+        self.status = 200
+        self.delay = 0.0
+        self.queries = []  # every query that reached the server
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class _MemoryHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.queries.append(parse_qs(urlsplit(self.path).query).get("query", [""])[0])
+        time.sleep(server.delay)
+        body = server.text.encode("utf-8") if server.status == 200 else b"unavailable"
+        try:
+            self.send_response(server.status)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass  # the client gave up at its deadline
+
+
+async def run(server: FakeMemory) -> list:
+    from external_memory import CircuitBreaker, ExternalMemoryClient
+
+    results = []
+
+    def check(name: str, ok: bool, detail: str):
+        results.append((name, ok, detail))
+
+    client = ExternalMemoryClient(server.url, cache_ttl_s=60.0, breaker=CircuitBreaker(failures=2, reset_s=0.5))
+    try:
+        first = await client.fetch("What is my cat called?", 1.0)
+        second = await client.fetch("  what is my CAT called? ", 1.0)
+        check("cache hit", first == second == server.text and len(server.queries) == 1,
+              f"{len(server.queries)} request(s) for 2 lookups")
+
+        server.delay = 0.5
+        t0 = time.perf_counter()
+        text = await client.fetch("where do I live", 0.1)
+        took = time.perf_counter() - t0
+        check("deadline miss", text == "" and took < 0.3, f"returned {text!r} after {took * 1000:.0f}ms")
+
+        server.delay, server.status = 0.0, 503
+        await client.fetch("what is my name", 1.0)  # second failure in a row: opens
+        sent = len(server.queries)
+        text = await client.fetch("what is my name", 1.0)
+        check("breaker open", text == "" and client.breaker.state == "open" and len(server.queries) == sent,
+              f"state {client.breaker.state}, {len(server.queries) - sent} request(s) while open")
+
+        server.status = 200
+        await asyncio.sleep(client.breaker.reset_s)
+        state = client.breaker.state
+        text = await client.fetch("what is my name", 1.0)
+        check("half-open recovery", state == "half-open" and text == server.text and client.breaker.state == "closed",
+              f"{state} -> {client.breaker.state}, returned {text!r}")
+    finally:
+        await client.aclose()
+    return results
+
+
+def main():
+    server = FakeMemory()
+    threading.Thread(target=server.serve_forever, name="fake-memory", daemon=True).start()
+    try:
+        results = asyncio.run(run(server))
+    finally:
+        server.shutdown()
+    for name, ok, detail in results:
+        print(f"  {'ok  ' if ok else 'FAIL'} {name:<20}{detail}")
+    if not all(ok for _, ok, _ in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+
+import metrics
+
+DEFAULT_DROP_POLICY = {
+    "state": "drop_oldest",
+    "waveform": "drop_oldest",
+    "metrics": "drop_oldest",
+    "audio": "never",
+}
+
+_ids = itertools.count(1)
+_slots = set()  # metric label slots held by open sessions
+
+
+def _take_slot() -> int:
+    """Lowest free slot, so per-client series stay bounded by concurrent clients, not by reconnects."""
+    slot = 0
+    while slot in _slots:
+        slot += 1
+    _slots.add(slot)
+    return slot
+
+
+class ClientSession:
+    """
+    Outbound side of one websocket client. broadcast() only appends to the
+    client's queues, so one stalled browser tab can't hold up the others or
+    the interaction loop.
+
+    Two writer tasks per client:
+      - control lane: JSON/state/waveform frames, bounded to `queue_size`;
+        when full, the incoming kind's policy decides: drop_newest drops the
+        new frame, otherwise the oldest queued frame of that kind goes, else
+        the oldest droppable one of any kind. Only a lane full of `never`
+        frames grows past the bound.
+      - audio lane: never dropped, paced to at most `lead_s` ahead of real time.
+    A send that takes longer than `send_timeout` or an audio backlog beyond
+    `max_audio_backlog_s` disconnects the client as too slow.
+    """
+
+    def __init__(self, websocket, queue_size: int = 32, send_timeout: float = 5.0,
+                 max_audio_backlog_s: float = 30.0, lead_s: float = 0.5, drop_policy: dict = None):
+        self.websocket = websocket
+        self.id = next(_ids)
+        self.slot = _take_slot()
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.max_audio_backlog_s = max_audio_backlog_s
+        self.lead_s = lead_s
+        self.drop_policy = {**DEFAULT_DROP_POLICY, **(drop_policy or {})}
+        self.audio_fmt = None  # no audio until the client asks for a format, see audio_protocol.FORMATS
+        self.closed = False
+        self._control = deque()  # (kind, payload, enqueued_at)
+        self._control_ready = asyncio.Event()
+        self._audio = deque()    # (frame, seconds, enqueued_at)
+        self._audio_ready = asyncio.Event()
+        self._audio_backlog_s = 0.0
+        self._restart_clock = False
+        labels = {"client": str(self.slot)}
+        self._latency = metrics.histogram("ws_fanout_latency_seconds", "Enqueue-to-sent time per client", labels)
+        self._dropped = metrics.counter("ws_dropped_frames", "Frames dropped for a slow client", labels)
+        self._tasks = [asyncio.create_task(self._write_control()), asyncio.create_task(self._write_audio())]
+
+    def send(self, payload, kind: str = "state"):
+        if self.closed:
+            return
+        now = time.perf_counter()
+        if len(self._control) >= self.queue_size:
+            policy = self.drop_policy.get(kind, "drop_oldest")
+            if policy == "drop_newest":
+                self._dropped.inc()
+                return
+            victim = next((i for i, (k, _, _) in enumerate(self._control) if k == kind and policy != "never"), None)
+            if victim is None:
+                victim = next((i for i, (k, _, _) in enumerate(self._control)
+                               if self.drop_policy.get(k, "drop_oldest") != "never"), None)
+            if victim is not None:
+                del self._control[victim]
+                self._dropped.inc()
+        self._control.append((kind, payload, now))
+        self._control_ready.set()
+
+    def send_audio(self, frame: bytes, seconds: float):
+        if self.closed:
+            return
+        self._audio.append((frame, seconds, time.perf_counter()))
+        self._audio_backlog_s += seconds
+        self._audio_ready.set()
+        if self._audio_backlog_s > self.max_audio_backlog_s:
+            self.evict(f"{self._audio_backlog_s:.1f}s of audio backlog")
+
+    def flush_audio(self):
+        """Drop queued audio frames (barge-in); the next frame starts a fresh pacing clock."""
+        self._audio.clear()
+        self._audio_backlog_s = 0.0
+        self._restart_clock = True
+
+    async def _send(self, payload, enqueued_at: float) -> bool:
+        try:
+            await asyncio.wait_for(self.websocket.send(payload), timeout=self.send_timeout)
+        except asyncio.TimeoutError:
+            self.evict(f"send took over {self.send_timeout}s")
+            return False
+        except Exception:
+            self.close()
+            return False
+        self._latency.observe(time.perf_counter() - enqueued_at)
+        return True
+
+    async def _write_control(self):
+        while not self.closed:
+            if not self._control:
+                self._control_ready.clear()
+                await self._control_ready.wait()
+                continue
+            _, payload, enqueued_at = self._control.popleft()
+            if not await self._send(payload, enqueued_at):
+                return
+
+    async def _write_audio(self):
+        clock_start, sent_s = 0.0, 0.0
+        while not self.closed:
+            if not self._audio or self._restart_clock:
+                self._restart_clock = False
+                clock_start, sent_s = 0.0, 0.0  # idle or flushed: restart the pacing clock
+                if self._audio:
+                    continue
+                self._audio_ready.clear()
+                await self._audio_ready.wait()
+                continue
+            frame, seconds, enqueued_at = self._audio.popleft()
+            now = time.perf_counter()
+            if not clock_start:
+                clock_start = now
+            ahead = sent_s - (now - clock_start)
+            if ahead > self.lead_s:
+                await asyncio.sleep(ahead - self.lead_s)
+            if not await self._send(frame, enqueued_at):
+                return
+            sent_s += seconds
+            self._audio_backlog_s = max(0.0, self._audio_backlog_s - seconds)
+
+    def evict(self, reason: str):
+        if self.closed:
+            return
+        print(f"Disconnecting slow client {self.id}: {reason}")
+        metrics.counter("ws_evicted_clients", "Clients disconnected as too slow").inc()
+        self.close()
+        asyncio.create_task(self.websocket.close(code=1008, reason="too slow"))
+
+    def close(self):
+        if not self.closed:
+            _slots.discard(self.slot)
+        self.closed = True
+        self._control.clear()
+        self._audio.clear()
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import metrics
+
+OUTCOMES = ("hit", "empty", "late", "error")
+
+
+class ContextSource:
+    """A named async lookup (query -> text) with per-source hit/latency stats."""
+
+    def __init__(self, name: str, fetch: Callable[[str], Awaitable[str]]):
+        self.name = name
+        self.fetch = fetch
+        labels = {"source": name}
+        self.latency = metrics.histogram("context_source_latency_seconds", "Context source lookup time", labels)
+        self.outcomes = {o: metrics.counter("context_source_results", "Context lookups by outcome",
+                                            dict(labels, outcome=o)) for o in OUTCOMES}
+        self._hit_rate = metrics.gauge("context_source_hit_rate", "Share of lookups that returned text in time", labels)
+        metrics.collect(self._collect)
+
+    def hit_rate(self) -> float:
+        total = sum(g.value for g in self.outcomes.values())
+        return self.outcomes["hit"].value / total if total else 0.0
+
+    def _collect(self):
+        self._hit_rate.set(self.hit_rate())
+
+
+async def assemble(sources: List[ContextSource], query: str, deadline_s: float) -> Dict[str, str]:
+    """
+    Start every source at once and wait at most deadline_s. Sources that
+    finish in time contribute their text; late ones are logged and left to
+    finish in the background (so caches behind them still warm up) but
+    are not waited for.
+    """
+    t0 = time.perf_counter()
+    tasks = {}
+    for source in sources:
+        task = asyncio.create_task(source.fetch(query))
+        task.add_done_callback(lambda t, s=source: s.latency.observe(time.perf_counter() - t0))
+        tasks[task] = source
+    done, pending = await asyncio.wait(tasks, timeout=deadline_s) if tasks else (set(), set())
+
+    results = {}
+    for task in done:
+        source = tasks[task]
+        if task.exception() is not None:
+            print(f"[context] {source.name} failed: {task.exception()!r}")
+            source.outcomes["error"].inc()
+            continue
+        text = task.result() or ""
+        source.outcomes["hit" if text else "empty"].inc()
+        if text:
+            results[source.name] = text
+    if pending:
+        late = []
+        for task in pending:
+            tasks[task].outcomes["late"].inc()
+            late.append(tasks[task].name)
+            task.add_done_callback(_discard_result)
+        print(f"[context] late after {deadline_s * 1000:.0f}ms: {', '.join(sorted(late))}")
+    return results
+
+
+def _discard_result(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()  # retrieve so a late failure isn't reported as "never retrieved"
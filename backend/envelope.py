@@ -0,0 +1,52 @@
+import numpy as np
+
+FRAME_S = 0.020
+DB_FLOOR = -60.0
+BAND_LO_HZ = 80.0
+BAND_HI_HZ = 8000.0
+
+_band_cache = {}
+
+
+def _band_edges(hop: int, sample_rate: int, bands: int):
+    """(rfft bin where each of `bands` log-spaced bands starts, bin where the last one stops)."""
+    key = (hop, sample_rate, bands)
+    edges = _band_cache.get(key)
+    if edges is None:
+        freqs = np.fft.rfftfreq(hop, 1.0 / sample_rate)
+        hz = np.geomspace(BAND_LO_HZ, min(BAND_HI_HZ, sample_rate / 2), bands + 1)
+        bins = np.searchsorted(freqs, hz).clip(0, len(freqs) - 1)
+        stop = max(int(bins[-1]), int(bins[-2]) + 1)
+        edges = _band_cache[key] = (bins[:-1], stop)
+    return edges
+
+
+def _to_u8(level: np.ndarray) -> np.ndarray:
+    """Power -> 0..255 over a 60 dB range."""
+    db = 10.0 * np.log10(np.maximum(level, 1e-12))
+    return (np.clip((db - DB_FLOOR) / -DB_FLOOR, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+
+def compute_envelope(chunk: np.ndarray, sample_rate: int, bands: int = 0) -> np.ndarray:
+    """
+    Per-20ms amplitude envelope of a mono float32 chunk, as uint8 rows of
+    [rms, band_0 .. band_{bands-1}] (dB-scaled). Bands come from one batched
+    rfft over all frames.
+    """
+    hop = int(sample_rate * FRAME_S)
+    n = -(-len(chunk) // hop)
+    if n == 0:
+        return np.zeros((0, 1 + bands), dtype=np.uint8)
+    frames = np.zeros(n * hop, dtype=np.float32)
+    frames[:len(chunk)] = chunk
+    frames = frames.reshape(n, hop)
+    out = np.empty((n, 1 + bands), dtype=np.uint8)
+    out[:, 0] = _to_u8(np.mean(frames * frames, axis=1))
+    if bands:
+        power = np.abs(np.fft.rfft(frames * np.hanning(hop).astype(np.float32), axis=1)) ** 2
+        starts, stop = _band_edges(hop, sample_rate, bands)
+        # the last band ends at BAND_HI_HZ, not Nyquist
+        band_power = np.add.reduceat(power[:, :stop], starts, axis=1)
+        widths = np.diff(np.append(starts, stop)).clip(1)
+        out[:, 1:] = _to_u8(band_power / (widths * hop))
+    return out
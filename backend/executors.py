@@ -0,0 +1,43 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that reports how saturated it is: tasks running,
+    tasks waiting for a worker, and how long they waited. Used as the
+    loop's default executor and for TTS, where a backlog means speech
+    falls behind.
+    """
+
+    def __init__(self, name: str, max_workers: int = None):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        labels = {"executor": name}
+        self._active = metrics.gauge("executor_active_tasks", "Tasks running on the executor", labels)
+        self._queued = metrics.gauge("executor_queued_tasks", "Tasks waiting for a worker", labels)
+        self._wait = metrics.histogram("executor_queue_wait_seconds", "Submit-to-start delay", labels)
+        self._done = metrics.counter("executor_completed_tasks", "Tasks finished on the executor", labels)
+        metrics.gauge("executor_max_workers", "Worker threads", labels).set(self._max_workers)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued.inc()
+
+        def run():
+            with self._lock:
+                self._queued.dec()
+                self._active.inc()
+            self._wait.observe(time.perf_counter() - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active.dec()
+                self._done.inc()
+
+        return super().submit(run)
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+
+import metrics
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive errors; while open every call
+    is refused for `reset_s`, then one trial call is let through (half-open)
+    and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failures: int = 3, reset_s: float = 30.0):
+        self.failures = failures
+        self.reset_s = reset_s
+        self._errors = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self._opened_at >= self.reset_s else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record(self, ok: bool):
+        self._trial = False
+        if ok:
+            self._errors = 0
+            self._opened_at = None
+            return
+        self._errors += 1
+        if self._opened_at is not None or self._errors >= self.failures:
+            self._opened_at = time.monotonic()
+
+
+class ExternalMemoryClient:
+    """
+    Async client for the phone-home memory endpoint: one keep-alive
+    connection pool, a hard per-call deadline, a circuit breaker for a dead
+    endpoint and a small TTL cache keyed by the normalized query.
+    Failures of any kind return "" - recall is optional context.
+    """
+
+    def __init__(self, url: str, cache_ttl_s: float = 60.0, cache_size: int = 64,
+                 breaker: CircuitBreaker = None):
+        self.url = url
+        self.cache_ttl_s = cache_ttl_s
+        self.cache_size = cache_size
+        self.breaker = breaker or CircuitBreaker()
+        self._cache: OrderedDict = OrderedDict()  # query -> (expires, text)
+        self._client = httpx.AsyncClient(limits=httpx.Limits(max_connections=2, max_keepalive_connections=2))
+        self._latency = metrics.histogram("external_memory_latency_seconds", "Phone-home memory fetch time")
+        self._outcomes = {k: metrics.counter("external_memory_requests", "Phone-home memory lookups by outcome",
+                                             {"outcome": k})
+                          for k in ("hit", "ok", "error", "timeout", "open")}
+
+    async def fetch(self, query: str, deadline_s: float) -> str:
+        key = " ".join(query.lower().split())
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            self._outcomes["hit"].inc()
+            return cached[1]
+        if not self.breaker.allow():
+            self._outcomes["open"].inc()
+            return ""
+        t0 = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self._client.get(self.url, params={"query": query}, timeout=deadline_s), timeout=deadline_s)
+            response.raise_for_status()
+            text = response.text.strip()
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            self.breaker.record(False)
+            self._outcomes["timeout"].inc()
+            print(f"Memory fetch missed its {deadline_s:.2f}s deadline")
+            return ""
+        except Exception as e:
+            self.breaker.record(False)
+            self._outcomes["error"].inc()
+            print(f"Memory fetch failed: {e}")
+            return ""
+        finally:
+            self._latency.observe(time.perf_counter() - t0)
+        self.breaker.record(True)
+        self._outcomes["ok"].inc()
+        self._cache[key] = (time.monotonic() + self.cache_ttl_s, text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return text
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,232 @@
+import asyncio
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+FIRST_TOKEN_TIMEOUT_S = 60
+TOKEN_TIMEOUT_S = 30
+
+DEADLINE_CHECK_S = 0.5
+
+_END = object()
+_TIMEOUT = object()
+
+
+def token_text(chunk) -> str:
+    # one decoded NDJSON line of an /api/generate stream (OllamaRequest)
+    return chunk.get("response", "") or ""
+
+
+class TokenStream:
+    """
+    Async iterator over the text of a blocking ollama stream.
+
+    One producer thread drains the stream and hands tokens to the event loop
+    in batches: it only schedules a wake-up when the pending batch goes from
+    empty to non-empty, so a burst of tokens costs one loop callback and one
+    queue hop instead of an executor round trip and a timer per token.
+    First-token and inter-token deadlines are enforced by one periodic check
+    instead of a wait_for per get.
+
+    The stream doubles as the generation handle: cancel() (called on a
+    deadline, or by a user "stop") ends iteration at once, runs the abort
+    hook to tear down the HTTP connection so Ollama stops generating, and
+    closes the source generator so the producer thread exits.
+    """
+
+    def __init__(self, source: Callable[[], Iterable],
+                 first_token_timeout: float = FIRST_TOKEN_TIMEOUT_S,
+                 token_timeout: float = TOKEN_TIMEOUT_S,
+                 abort: Optional[Callable[[], None]] = None):
+        self._source = source
+        self._abort = abort
+        self.first_token_timeout = first_token_timeout
+        self.token_timeout = token_timeout
+        self.final = None         # last chunk (done=True carries eval stats)
+        self.timed_out = False
+        self.cancelled = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._lock = threading.Lock()
+        self._pending: List = []
+        self._scheduled = False
+        self._thread: Optional[threading.Thread] = None
+        self._got_token = False
+        self._finished = False
+        self._last_activity = 0.0
+        self._deadline_timer: Optional[asyncio.TimerHandle] = None
+
+    def start(self):
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._thread = threading.Thread(target=self._produce, name="llm-stream", daemon=True)
+            self._last_activity = time.monotonic()
+            self._thread.start()
+            self._deadline_timer = self._loop.call_later(DEADLINE_CHECK_S, self._check_deadline)
+        return self
+
+    def _check_deadline(self):
+        timeout = self.token_timeout if self._got_token else self.first_token_timeout
+        if time.monotonic() - self._last_activity > timeout:
+            self.timed_out = True
+            self._queue.put_nowait([_TIMEOUT])
+            self.cancel()
+            return
+        self._deadline_timer = self._loop.call_later(DEADLINE_CHECK_S, self._check_deadline)
+
+    def _push(self, item):
+        with self._lock:
+            self._pending.append(item)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._loop.call_soon_threadsafe(self._deliver)
+
+    def _deliver(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._scheduled = False
+        self._last_activity = time.monotonic()
+        self._queue.put_nowait(batch)
+
+    def cancel(self):
+        """Stop generation; safe to call from any thread, more than once."""
+        if self.cancelled.is_set():
+            return
+        self.cancelled.set()
+        if self._abort is not None:
+            try:
+                self._abort()
+            except Exception as e:
+                print(f"LLM abort failed: {e}")
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, [_END])
+
+    def _produce(self):
+        gen = None
+        try:
+            gen = self._source()
+            for chunk in gen:
+                if self.cancelled.is_set():
+                    break
+                self.final = chunk
+                text = token_text(chunk)
+                if text:
+                    self._push(text)
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self._push(e)
+        finally:
+            close = getattr(gen, "close", None)
+            if close is not None:
+                close()  # runs OllamaRequest.__iter__'s finally, closing the connection
+        self._push(_END)
+
+    async def __aiter__(self):
+        self.start()
+        try:
+            while True:
+                batch = await self._queue.get()
+                for item in batch:
+                    if self.cancelled.is_set() and not self.timed_out:
+                        return
+                    if item is _END:
+                        self._finished = True
+                        return
+                    if item is _TIMEOUT:
+                        kind = "inter-token" if self._got_token else "first-token"
+                        print(f"LLM stream hit the {kind} deadline")
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    self._got_token = True
+                    yield item
+        finally:
+            if self._deadline_timer is not None:
+                self._deadline_timer.cancel()
+            # a consumer that stops early must not leave the model generating
+            if not self._finished:
+                self.cancel()
+
+
+def _ollama_address():
+    host = os.environ.get("OLLAMA_HOST", "127.0.0.1:11434")
+    if "://" not in host:
+        host = "http://" + host
+    parts = urlsplit(host)
+    hostname = parts.hostname or "127.0.0.1"
+    if hostname == "0.0.0.0":
+        hostname = "127.0.0.1"
+    return hostname, parts.port or 11434
+
+
+class OllamaRequest:
+    """
+    One streaming Ollama API call on a connection we own, so abort() can shut
+    the socket down from another thread. That wakes a reader blocked in recv
+    (even mid-prefill, before any header arrives) and the server drops the
+    request on disconnect.
+    """
+
+    def __init__(self, path: str, payload: dict, timeout: float = None):
+        self.path = path
+        self.payload = payload
+        self.aborted = False
+        host, port = _ollama_address()
+        # timeout bounds the connect and each read; None waits as long as the server takes
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def __iter__(self):
+        body = json.dumps(self.payload)
+        self.conn.request("POST", self.path, body=body, headers={"Content-Type": "application/json"})
+        if self.aborted:
+            self.abort()
+        resp = self.conn.getresponse()
+        if resp.status != 200:
+            raise RuntimeError(f"ollama {self.path} returned {resp.status}: {resp.read(200)!r}")
+        try:
+            for line in resp:
+                if not line.strip():
+                    continue
+                part = json.loads(line)
+                if part.get("error"):
+                    raise RuntimeError(part["error"])
+                yield part
+        finally:
+            self.conn.close()
+
+    def abort(self):
+        self.aborted = True
+        sock = self.conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def stream_generate(model: str, prompt: str, **kwargs) -> TokenStream:
+    req = OllamaRequest("/api/generate", {"model": model, "prompt": prompt, "stream": True, **kwargs})
+    return TokenStream(lambda: iter(req), abort=req.abort)
+
+
+def warm_up(model: str, keep_alive: str, options: dict = None, timeout: float = None) -> dict:
+    """
+    Load the model into memory ahead of the first turn: a generate with no
+    prompt only loads the weights, and keep_alive holds them resident. Pass
+    the same options (num_ctx) as real turns, or the runner reloads later.
+    A server that doesn't answer within `timeout` raises socket.timeout.
+    """
+    payload = {"model": model, "stream": False, "keep_alive": keep_alive}
+    if options:
+        payload["options"] = options
+    last = {}
+    for part in OllamaRequest("/api/generate", payload, timeout=timeout):
+        last = part
+    return last
@@ -0,0 +1,83 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+import metrics
+import timeline
+
+
+class LoopMonitor:
+    """
+    Event-loop lag monitor.
+
+    A heartbeat coroutine sleeps `interval` and records how late it woke
+    (loop_lag_seconds): that is how long ready callbacks waited behind
+    whatever was running. Lag only shows up once the loop is free again,
+    so a watchdog thread also watches the heartbeat. When it is overdue by
+    more than `threshold`, the watchdog grabs the loop thread's stack with
+    sys._current_frames() while the blocking call is still on it, and logs
+    it with the current turn id. Each stall is reported once; its total
+    length is logged when the loop comes back.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.last_beat = 0.0
+        self.lags: deque = deque(maxlen=4096)  # recent heartbeat delays, for benchmarks
+        self._beat = 0
+        self._reported_beat = -1
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._lag = metrics.histogram("loop_lag_seconds", "Heartbeat wake-up delay on the event loop",
+                                      buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+        self._stalls = metrics.counter("loop_stalls", "Times the loop was blocked past the threshold")
+        self._max = metrics.gauge("loop_lag_max_seconds", "Worst heartbeat delay since start")
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self._lag.observe(lag)
+            self.lags.append(lag)
+            if lag > self._max.value:
+                self._max.set(lag)
+            if self._reported_beat == self._beat:
+                print(f"[loop] unblocked after {(now - self.last_beat) * 1000:.0f}ms")
+            self._beat += 1
+            self.last_beat = now
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            beat, last = self._beat, self.last_beat
+            overdue = time.perf_counter() - last - self.interval
+            if overdue < self.threshold or beat == self._reported_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._reported_beat = beat
+            self._stalls.inc()
+            turn = timeline.current
+            turn_id = turn.turn_id if turn is not None else "idle"
+            stack = "".join(traceback.format_stack(frame))
+            print(f"[loop] blocked for {overdue * 1000:.0f}ms+ (turn {turn_id}), loop thread is at:\n{stack}")
@@ -2,15 +2,32 @@ import asyncio
 import websockets
 import json
 import re
-import requests
-from concurrent.futures import ThreadPoolExecutor
 import os
 import ast
+import time
+from collections import deque
 
-from prompts import format_user_prompt, SYSTEM_PROMPT
-from tts import generate_audio_chunks, preload_tts
+from prompts import build_prompt
+import tts
+from tts import generate_audio_chunks, SAMPLE_RATE
+import stt
 from stt import listen
-from tools import create_file, read_file, list_dir, find_file, MacroStore
+from tools import create_file, read_file, list_dir, find_file, MacroStore, workspace_fingerprint
+from segmenter import SentenceSegmenter, ToolBlockScanner
+import timeline
+import settings
+import metrics
+from executors import InstrumentedExecutor
+from audio_stream import ChunkStream, Utterance
+from audio_protocol import encode_audio, encode_envelope, FORMATS, FLAG_START
+from clients import ClientSession
+from context import ContextSource, assemble
+from session import PromptSession, fingerprint
+import llm
+from llm import stream_generate
+import startup
+import profiler
+from loopwatch import LoopMonitor
 
 MODEL_NAME = os.environ.get("ELYSIA_MODEL", "orieg/gemma3-tools:1b-it-qat")
 
@@ -26,8 +43,6 @@ SAFE_TOOLS = {
     "find": find_file,
 }
 
-TOOL_BLOCK_RE = re.compile(r"```tool_code\s*(.*?)```", re.S)
-
 _macro_store = MacroStore()
 
 def add_macro_tool(name: str, steps: list) -> str:
@@ -68,6 +83,9 @@ SAFE_TOOLS.update({
     "run_macro": run_macro,
 })
 
+# tools that change what other tools (and so cached answers) would see
+MUTATING_TOOLS = {"create_file", "edit_file", "add_macro_tool", "remove_macro_tool", "run_macro"}
+
 def _run_tool_block(block: str) -> list[str]:
     results = []
     for line in block.strip().splitlines():
@@ -86,22 +104,76 @@ def _run_tool_block(block: str) -> list[str]:
             kwargs = {}
             for kw in call.keywords:
                 kwargs[kw.arg] = ast.literal_eval(kw.value)
-            results.append(str(fn(**kwargs)))
+            if call.func.id in MUTATING_TOOLS and response_cache is not None:
+                response_cache.invalidate()
+                asyncio.get_running_loop().run_in_executor(None, response_cache.purge)
+            t0 = time.perf_counter()
+            try:
+                results.append(str(fn(**kwargs)))
+            finally:
+                metrics.histogram("tool_call_seconds", "Tool execution time",
+                                  {"tool": call.func.id}).observe(time.perf_counter() - t0)
         except Exception as e:
             results.append(f"ERROR: {type(e).__name__}: {e}")
     return results
 
-connected_clients = set()
+clients = {}  # websocket -> ClientSession
+audio_seq = 0
+envelope_bands = None  # follows settings; None = no envelope frames
 speech_queue = asyncio.Queue()
 scratchpad = []
+current_generation = None  # TokenStream of the turn in flight
+interaction_task = None
+startup_task = None
+memory_client = None  # ExternalMemoryClient, built on first phone-home lookup
+prompt_session = PromptSession()
+response_cache = None  # ResponseCache, built on first use when enabled
+turn_audio = None  # [(text, chunks)] delivered this turn, while recording for the response cache
+speech_epoch = 0  # bumped by stop_speaking(); the speaker skips sentences queued under an older one
+audio_player = None  # AudioPlayer, once main() has opened the output
 
 async def broadcast(message_type: str):
     data = json.dumps({"type": message_type})
-    for client in list(connected_clients):
-        try:
-            await client.send(data)
-        except:
-            pass
+    for session in list(clients.values()):
+        session.send(data, kind="state")
+
+def send_audio(chunk, start: bool = False):
+    """
+    Fan a TTS chunk (and its envelope) out to the clients that asked for audio,
+    encoding once per wire format. Audio is opt-in per client ("audio_format"
+    action): the backend already plays through its own output, and a browser
+    on the same machine playing it too would echo.
+    Returns the envelope frame (None when envelopes are off) for the other
+    clients; send_waveform() gives it to them once the chunk starts playing here.
+    """
+    global audio_seq
+    if not clients:
+        return None
+    seconds = len(chunk) / SAMPLE_RATE
+    envelope = None
+    if envelope_bands is not None:
+        from envelope import compute_envelope, FRAME_S
+        rows = compute_envelope(chunk, SAMPLE_RATE, envelope_bands)
+        envelope = encode_envelope(rows, audio_seq, round(1 / FRAME_S))
+    frames = {}
+    for session in clients.values():
+        if session.audio_fmt is None:
+            continue
+        if envelope is not None:
+            session.send_audio(envelope, 0.0)
+        frame = frames.get(session.audio_fmt)
+        if frame is None:
+            frame = frames[session.audio_fmt] = encode_audio(
+                chunk, audio_seq, SAMPLE_RATE, session.audio_fmt, FLAG_START if start else 0)
+        session.send_audio(frame, seconds)
+    audio_seq += 1
+    return envelope
+
+def send_waveform(envelope: bytes):
+    """Envelope rows for clients that don't play the audio; they draw them from arrival."""
+    for session in clients.values():
+        if session.audio_fmt is None:
+            session.send(envelope, "waveform")
 
 def clean_for_tts(text: str) -> str:
     text = re.sub(r"\[([^\]]+)\]", "", text)
@@ -109,114 +181,459 @@ def clean_for_tts(text: str) -> str:
     text = re.sub(r"(\s*\n\s*){2,}", "\n\n", text)
     return text.strip()
 
-async def speaker_task():
-    executor = ThreadPoolExecutor(max_workers=2)
-    loop = asyncio.get_event_loop()
-    while True:
-        text = await speech_queue.get()
-        if text is None:
-            break
-        await broadcast("speaking")
-        audio_gen = await loop.run_in_executor(executor, generate_audio_chunks, text)
-        async for chunk in audio_gen:
-            pass  # Stream to frontend if needed
-        speech_queue.task_done()
-    executor.shutdown()
+async def speaker_task(player=None):
+    """
+    Look-ahead TTS pipeline: up to tts_lookahead sentences past the one being
+    delivered are synthesized ahead of time, and delivery stays in queue order.
+    Each sentence is a ChunkStream, so chunks are delivered while later ones
+    of the same sentence are still being synthesized.
+    A sentence is task_done() only once its last frame has been played.
+    """
+    lookahead = settings.current().tts_lookahead
+    # one worker: sentences are synthesized back to back, not competing for cores
+    executor = InstrumentedExecutor("tts", max_workers=1)
+    slots = asyncio.Semaphore(lookahead + 1)
+    pending = asyncio.Queue()
+
+    in_flight = metrics.gauge("tts_in_flight", "Sentences synthesizing or synthesized, not yet delivered")
+    ahead_margin = metrics.histogram(
+        "tts_ahead_margin_seconds", "How long audio was ready before it was needed",
+        buckets=(0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+    gap = metrics.histogram("tts_gap_seconds", "Delivery stalls waiting on synthesis")
+
+    async def feed():
+        while True:
+            await slots.acquire()
+            text = await speech_queue.get()
+            if text is None:
+                await pending.put(None)
+                return
+            epoch = speech_epoch
+            in_flight.inc()
+            if isinstance(text, Utterance):
+                source, text = (lambda chunks=text.chunks: iter(chunks)), text.text
+            else:
+                source = lambda text=text: generate_audio_chunks(text)
+            stream = ChunkStream(source).start(executor)
+            await pending.put((text, stream, epoch))
+
+    def waveform_played(envelope: bytes, epoch: int):
+        if epoch == speech_epoch:  # a barge-in flush also passes the marker
+            send_waveform(envelope)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            text, stream, epoch = item
+            if epoch != speech_epoch:
+                # interrupted before its turn came: stop synthesis and skip it
+                stream.cancel()
+                in_flight.dec()
+                slots.release()
+                speech_queue.task_done()
+                continue
+            await broadcast("speaking")
+            needed_at = time.perf_counter()
+            first = True
+            recording = [] if turn_audio is not None else None
+            try:
+                async for chunk in stream:
+                    if epoch != speech_epoch:
+                        stream.cancel()
+                        recording = None
+                        break
+                    timeline.mark("first_audio_chunk", stream.first_chunk_at)
+                    if recording is not None:
+                        recording.append(chunk)
+                    try:
+                        envelope = send_audio(chunk, start=first)
+                    except Exception as e:
+                        envelope = None  # the clients miss this chunk; the speakers must not
+                        print(f"[ws] could not encode audio for clients: {e}")
+                    start_pos = player.ring.write_pos if player is not None else 0
+                    if player is not None:
+                        await player.play(chunk)
+                    if envelope is not None:
+                        if player is not None:
+                            player.mark(start_pos + 1).add_done_callback(
+                                lambda _, envelope=envelope, epoch=epoch: waveform_played(envelope, epoch))
+                        else:
+                            send_waveform(envelope)
+                    if first:
+                        first = False
+                        margin = needed_at - stream.first_chunk_at
+                        if margin >= 0:
+                            ahead_margin.observe(margin)
+                        else:
+                            # delivery had to wait on synthesis: an audible gap
+                            gap.observe(-margin)
+                        if player is not None:
+                            player.mark(start_pos + 1).add_done_callback(
+                                lambda _: timeline.mark("first_audio_played"))
+                if recording is not None and turn_audio is not None:
+                    turn_audio.append((text, recording))
+            except Exception as e:
+                stream.cancel()  # free the tts worker if delivery, not synthesis, failed
+                print(f"TTS failed for {text[:40]!r}: {e}")
+            in_flight.dec()
+            slots.release()
+            if player is not None:
+                # keep writing the next sentence while this one plays out
+                player.mark().add_done_callback(lambda _: speech_queue.task_done())
+            else:
+                speech_queue.task_done()
+    finally:
+        feeder.cancel()
+        executor.shutdown(wait=False)
 
 async def fetch_external_memory(user_input: str) -> str:
-    config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-    with open(config_path, 'r') as f:
-        config = json.load(f)
-    if not config.get('phone_home', False):
-        return ""
-    try:
-        url = f"{config['memory_url']}?query={requests.utils.quote(user_input)}"
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        return response.text.strip()
-    except Exception as e:
-        print(f"Memory fetch failed: {e}")
+    global memory_client
+    config = settings.current()
+    if not config.phone_home:
         return ""
+    if memory_client is None:
+        from external_memory import ExternalMemoryClient, CircuitBreaker  # httpx is only needed with phone_home
+        memory_client = ExternalMemoryClient(
+            config.memory_url,
+            cache_ttl_s=config.memory_cache_ttl_s,
+            breaker=CircuitBreaker(config.memory_breaker_failures, config.memory_breaker_reset_s))
+    # gather_context stops waiting at context_deadline_s; a longer fetch would only ever come back "late"
+    deadline = min(config.memory_deadline_s, config.context_deadline_s)
+    return await memory_client.fetch(user_input, deadline)
 
 def get_scratchpad_context():
     return "\n".join(f"[{role}] {msg}" for role, msg in scratchpad)
 
-async def handle_request(user_input: str):
-    external_memory = await fetch_external_memory(user_input)
-    memory_text = get_scratchpad_context() + ("\n" + external_memory if external_memory else "")
-    prompt = format_user_prompt(user_input, memory_text)
-    scratchpad.append(("user", user_input))
-    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as f:
-        config = json.load(f)
-    scratchpad[:] = scratchpad[-config.get('recent_memory_limit', 5):]
+async def _scratchpad_source(_query: str) -> str:
+    return get_scratchpad_context()
 
-    accum, tail = "", ""
-    spoken = []
+memory_search = metrics.histogram("memory_search_seconds", "Local memory (SQLite FTS) search time")
 
-    import ollama
-    resp = ollama.generate(model=MODEL_NAME, prompt=prompt, stream=True)
+async def _local_memory_source(query: str) -> str:
+    import memory  # aiosqlite is only needed when local_memory is on
+    t0 = time.perf_counter()
+    try:
+        return await memory.retrieve_relevant_memory(query)
+    finally:
+        memory_search.observe(time.perf_counter() - t0)
 
-    TOKEN_TIMEOUT_S = 30
-    async def _aiter_with_timeout(gen, timeout_s: float):
-        loop = asyncio.get_event_loop()
-        it = iter(gen)
-        while True:
-            try:
-                yield await asyncio.wait_for(loop.run_in_executor(None, next, it), timeout=timeout_s)
-            except asyncio.TimeoutError:
-                break
-            except StopIteration:
-                break
+context_sources = {
+    "scratchpad": ContextSource("scratchpad", _scratchpad_source),
+    "external": ContextSource("external", fetch_external_memory),
+    "local_memory": ContextSource("local_memory", _local_memory_source),
+}
+
+def _split_snippets(text: str) -> list:
+    """One snippet per "[role] ..." entry; continuation lines stay with their entry."""
+    snippets = []
+    for line in text.splitlines():
+        if snippets and not line.startswith("["):
+            snippets[-1] += "\n" + line
+        elif line.strip():
+            snippets.append(line)
+    return snippets
+
+async def gather_context(user_input: str):
+    """(snippets, fingerprint of the non-scratchpad snippets) for this turn."""
+    config = settings.current()
+    enabled = [context_sources["scratchpad"]]
+    if config.phone_home:
+        enabled.append(context_sources["external"])
+    if config.local_memory:
+        enabled.append(context_sources["local_memory"])
+    results = await assemble(enabled, user_input, config.context_deadline_s)
+    snippets, long_term = [], []
+    for source in enabled:
+        if source.name in results:
+            found = _split_snippets(results[source.name])
+            snippets += found
+            if source.name != "scratchpad":
+                long_term += found
+    return snippets, fingerprint(long_term)
+
+async def _speak(text: str, spoken: list):
+    msg = clean_for_tts(text)
+    if msg:
+        timeline.mark("first_sentence")
+        await speech_queue.put(msg)
+        spoken.append(msg)
+
+async def _consume(events, segmenter: SentenceSegmenter, spoken: list, tool_results: list):
+    for kind, part in events:
+        if kind == "tool":
+            # finish the prose that led up to the call before speaking its results
+            for sentence in segmenter.flush():
+                await _speak(sentence, spoken)
+            timeline.mark("first_tool_call")
+            for result in _run_tool_block(part):
+                tool_results.append(result)
+                await _speak(result, spoken)
+        else:
+            for sentence in segmenter.feed(part):
+                await _speak(sentence, spoken)
+
+prompt_tokens = metrics.histogram("prompt_tokens", "Estimated prompt size per turn",
+                                  buckets=(256, 512, 1024, 1536, 2048, 3072, 4096))
+
+def _record_prefill(final, mode: str):
+    """Ollama's own prefill numbers from the done chunk; the proof that session mode pays off."""
+    if not final or not final.get("done"):
+        return
+    count = final.get("prompt_eval_count", 0)
+    seconds = final.get("prompt_eval_duration", 0) / 1e9
+    timeline.note("prefill_tokens", count)
+    timeline.note("prefill_ms", round(seconds * 1000))
+    metrics.histogram("llm_prefill_seconds", "Prompt evaluation time", {"mode": mode.split(":")[0]}).observe(seconds)
+
+def _drain_speech_queue():
+    while True:
+        try:
+            speech_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        speech_queue.task_done()
+
+def stop_speaking():
+    """
+    Abort generation, drop the sentences not yet spoken, cancel the ones
+    being synthesized and silence what is already buffered for playback.
+    Returns the player's clear() future (resolved once the audio thread
+    has dropped the buffer), or None without a player.
+    """
+    global speech_epoch
+    if current_generation is not None:
+        current_generation.cancel()
+    speech_epoch += 1
+    _drain_speech_queue()
+    flush = json.dumps({"flush_audio": True})
+    for session in list(clients.values()):
+        session.flush_audio()
+        session.send(flush, kind="state")
+    if audio_player is not None:
+        return audio_player.clear()
+    return None
+
+def _last_reply() -> str:
+    return next((msg for role, msg in reversed(scratchpad) if role == "assistant"), "")
+
+def _get_response_cache():
+    global response_cache
+    config = settings.current()
+    if not config.response_cache:
+        return None
+    if response_cache is None:
+        from response_cache import ResponseCache  # sqlite + numpy, first turn only
+        response_cache = ResponseCache(
+            ttl_s=config.response_cache_ttl_s,
+            max_entries=config.response_cache_size,
+            max_disk_bytes=int(config.response_cache_disk_mb * (1 << 20)))
+    return response_cache
+
+async def _replay_response(user_input: str, hit):
+    """Answer from the response cache: no LLM call, no synthesis."""
+    config = settings.current()
+    scratchpad.append(("user", user_input))
+    scratchpad[:] = scratchpad[-config.recent_memory_limit:]
+    for text, chunks in hit.replay():
+        timeline.mark("first_sentence")
+        await speech_queue.put(Utterance(text, chunks))
+    scratchpad.append(("assistant", hit.response))
+    prompt_session.reset()  # the model's context lacks this exchange; resend the scratchpad next turn
+
+async def _store_response(cache, generation: int, key: str, state: str, response: str, sentences: int):
+    """Once the turn has been spoken, cache it if every sentence's audio was captured."""
+    global turn_audio
+    await speech_queue.join()
+    recorded, turn_audio = turn_audio, None
+    if recorded is None or len(recorded) != sentences or cache.generation != generation:
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, cache.put, key, state, response, recorded)
+
+async def handle_request(user_input: str):
+    global turn_audio
+    try:
+        await _answer(user_input)
+    finally:
+        # however the turn ends, stop recording; speaker_task would otherwise append to it forever
+        turn_audio = None
+
+async def _answer(user_input: str):
+    global current_generation, turn_audio
+    loop = asyncio.get_running_loop()
+    cache = _get_response_cache()
+    if cache is not None:
+        # stat the workspace while memory is being searched
+        state_future = loop.run_in_executor(None, workspace_fingerprint)
+    snippets, memory_fp = await gather_context(user_input)
+    timeline.mark("context_ready")
+    if cache is not None:
+        cache_key, state = cache.key(user_input, memory_fp, _last_reply()), await state_future
+        hit = await loop.run_in_executor(None, cache.get, cache_key, state)
+        timeline.note("response_cache", "hit" if hit is not None else "miss")
+        if hit is not None:
+            await _replay_response(user_input, hit)
+            return
+        generation = cache.generation
+        turn_audio = []
+    config = settings.current()
+    budget = config.num_ctx - config.num_predict - config.prompt_headroom
+    prompt, prompt_stats = build_prompt(user_input, snippets, budget)
+    prompt_tokens.observe(prompt_stats["prompt_tokens"])
+    for key, value in prompt_stats.items():
+        timeline.note(key, value)
+    scratchpad.append(("user", user_input))
+    scratchpad[:] = scratchpad[-config.recent_memory_limit:]
+    # stream_tts=false restores the old buffer-then-speak behaviour for A/B timing
+    stream_tts = config.stream_tts
+
+    mode = "full"
+    gen_prompt, gen_context = prompt, None
+    if config.llm_session:
+        gen_prompt, gen_context, mode = prompt_session.plan(user_input, prompt, memory_fp, budget)
+    timeline.note("prompt_mode", mode)
 
     buf = []
-    async for chunk in _aiter_with_timeout(resp, TOKEN_TIMEOUT_S):
-        t = str(chunk)
-        if t:
+    spoken = []
+    tool_results = []
+    segmenter = SentenceSegmenter()
+    scanner = ToolBlockScanner()
+
+    timeline.mark("prompt_sent")
+    options = {"num_ctx": config.num_ctx, "num_predict": config.num_predict}
+    kwargs = {"options": options, "keep_alive": config.keep_alive}
+    if gen_context is not None:
+        kwargs["context"] = gen_context
+    stream = current_generation = stream_generate(MODEL_NAME, gen_prompt, **kwargs)
+    try:
+        async for t in stream:
+            timeline.mark("first_token")
             buf.append(t)
-
-    raw = "".join(buf)
-    if not raw:
+            if stream_tts:
+                await _consume(scanner.feed(t), segmenter, spoken, tool_results)
+    finally:
+        current_generation = None
+    _record_prefill(stream.final, mode)
+    if stream.cancelled.is_set():
+        prompt_session.reset()  # no context came back for this turn
+    if stream.cancelled.is_set() and not stream.timed_out:
+        _drain_speech_queue()
         return
 
-    accum += raw
+    accum = "".join(buf)
+    if not accum:
+        return
+    timeline.mark("generation_done")
 
-    while True:
-        m = TOOL_BLOCK_RE.search(accum)
-        if not m:
-            break
-        block = m.group(1)
-        accum = accum[:m.start()] + accum[m.end():]
-        for result in _run_tool_block(block):
-            msg = clean_for_tts(result)
-            if msg:
-                await speech_queue.put(msg)
-                spoken.append(msg)
-
-    clean = clean_for_tts(accum)
-    text = (tail + clean)[len(tail):]
-    parts = re.split(r'(?<=[.!?])\s+', text)
-    for s in parts[:-1]:
-        s = s.strip()
-        if s:
-            await speech_queue.put(s)
-            spoken.append(s)
-    tail = parts[-1]
-
-    last = clean_for_tts(tail).strip()
-    if last:
-        await speech_queue.put(last)
-        spoken.append(last)
+    if not stream_tts:
+        await _consume(scanner.feed(accum), segmenter, spoken, tool_results)
+    await _consume(scanner.flush(), segmenter, spoken, tool_results)
+    for sentence in segmenter.flush():
+        await _speak(sentence, spoken)
 
     response = " ".join(spoken).strip()
     if response:
         scratchpad.append(("assistant", response))
+    if config.llm_session and not stream.cancelled.is_set():
+        prompt_session.update(stream.final, memory_fp, tool_results)
+    if cache is not None and response and not stream.cancelled.is_set() and cache.generation == generation:
+        await _store_response(cache, generation, cache_key, state, response, len(spoken))
+
+barge_in_latency = {stage: metrics.histogram(
+    "barge_in_latency_seconds", "Voice trigger to playback silenced / turn torn down", {"stage": stage},
+    buckets=(0.02, 0.05, 0.1, 0.15, 0.25, 0.5, 1.0)) for stage in ("playback", "turn")}
+
+async def _interrupt(turn: asyncio.Task, triggered_at: float):
+    """Barge-in: silence playback, then cancel the turn wherever it is (context, LLM, tools, speech)."""
+    global turn_audio
+    timeline.mark("barge_in")
+    cleared = stop_speaking()
+    turn.cancel()
+    try:
+        await turn
+    except asyncio.CancelledError:
+        pass
+    turn_audio = None
+    turn_s = time.perf_counter() - triggered_at
+    barge_in_latency["turn"].observe(turn_s)
+    timeline.note("barge_in_turn_ms", round(turn_s * 1000))
+    if cleared is not None:
+        try:
+            await asyncio.wait_for(cleared, timeout=0.5)
+        except asyncio.TimeoutError:
+            print("[barge-in] audio thread did not flush within 500ms")
+            return
+        # buffered audio is gone once the callback skips it; what the device already holds still plays
+        silence_s = time.perf_counter() - triggered_at + audio_player.sink.latency()
+        barge_in_latency["playback"].observe(silence_s)
+        timeline.note("barge_in_ms", round(silence_s * 1000))
+
+async def _run_turn(user_input: str) -> bytes:
+    """
+    One turn (request plus playback), listening for barge-in the whole time.
+    Returns the audio captured since the user started talking over Elysia,
+    for the next listen(), or b"" when the turn ran to the end.
+    """
+    async def respond():
+        await handle_request(user_input)
+        await speech_queue.join()
+
+    turn = asyncio.create_task(respond())
+    config = settings.current()
+    if not config.barge_in:
+        await turn
+        return b""
+    from vad import BargeInDetector, EnergyVAD
+    vad = EnergyVAD(config.barge_in_margin_db, config.barge_in_min_ms, echo_margin_db=config.barge_in_echo_margin_db)
+    detector = BargeInDetector(vad, audio_player.output_level if audio_player is not None else None).start()
+    trigger = asyncio.create_task(detector.triggered.wait())
+    try:
+        await asyncio.wait({turn, trigger}, return_when=asyncio.FIRST_COMPLETED)
+        if not detector.triggered.is_set():
+            turn.result()  # surface a failed turn
+            return b""
+        print("[barge-in] user spoke over the response")
+        await _interrupt(turn, detector.triggered_at)
+        await detector.close()
+        return detector.preroll()
+    finally:
+        trigger.cancel()
+        await detector.close()
+
+turns_done = metrics.counter("turns", "Completed turns")
+turn_times = deque()  # monotonic finish times within the last minute
+
+def _collect_metrics():
+    now = time.monotonic()
+    while turn_times and now - turn_times[0] > 60:
+        turn_times.popleft()
+    metrics.gauge("turns_per_minute", "Turns completed in the last 60s").set(len(turn_times))
+    metrics.gauge("speech_queue_depth", "Sentences waiting for synthesis").set(speech_queue.qsize())
+    metrics.gauge("ws_clients", "Connected websocket clients").set(len(clients))
+
+metrics.collect(_collect_metrics)
+
+def _publish_turn(turn):
+    """Push the finished turn's timeline and the rolling p50/p95 to every client."""
+    if turn is None or not clients:
+        return
+    data = json.dumps({"type": "metrics", "turn": turn.to_dict(), "summary": timeline.percentiles()}, default=str)
+    for session in list(clients.values()):
+        session.send(data, kind="metrics")
 
 async def handle_interaction():
+    if startup_task is not None:
+        await asyncio.shield(startup_task)
     await broadcast("idle")
     loop = asyncio.get_event_loop()
+    preroll = b""
     while True:
         await broadcast("listening")
-        user_input = await loop.run_in_executor(None, listen)
+        user_input = await loop.run_in_executor(None, listen, preroll)
+        preroll = b""
         if not user_input:
             continue
         if user_input.lower() in {"exit", "quit", "bye"}:
@@ -224,27 +641,102 @@ async def handle_interaction():
             await speech_queue.join()
             break
         await broadcast("thinking")
-        await handle_request(user_input)
-        await speech_queue.join()
+        turn = timeline.start_turn(stt.last_speech_end)
+        profile = profiler.begin(turn.turn_id)
+        try:
+            preroll = await _run_turn(user_input)
+        except Exception as e:
+            # one failed turn (e.g. Ollama not running) shouldn't end the session
+            print(f"Turn failed: {e!r}")
+            timeline.note("error", repr(e))
+            await broadcast("error")
+        finally:
+            if profile is not None:
+                profile.stop()
+        turns_done.inc()
+        turn_times.append(time.monotonic())
+        _publish_turn(timeline.finish_turn())
+        if profile is not None:
+            latency = turn.marks.get("first_audio_chunk", turn.marks["turn_complete"])
+            loop.run_in_executor(None, profiler.finish, profile, latency * 1000)
+
+def _interaction_done(task: asyncio.Task):
+    """Nothing awaits the interaction task, so its failure is reported here."""
+    if task.cancelled() or task.exception() is None:
+        return
+    print(f"Interaction loop failed: {task.exception()!r}")
+    asyncio.ensure_future(broadcast("error"))
 
 async def websocket_handler(websocket, path=None):
-    connected_clients.add(websocket)
+    global interaction_task
+    config = settings.current()
+    session = clients[websocket] = ClientSession(
+        websocket,
+        queue_size=config.ws_queue_size,
+        send_timeout=config.ws_send_timeout_s,
+        max_audio_backlog_s=config.ws_max_audio_backlog_s,
+        drop_policy=config.ws_drop_policy)
     print("Client connected.")
     try:
         async for message in websocket:
             data = json.loads(message)
-            if data.get("action") == "start":
-                await handle_interaction()
+            action = data.get("action")
+            if action == "start":
+                if interaction_task is None or interaction_task.done():
+                    interaction_task = asyncio.create_task(handle_interaction())
+                    interaction_task.add_done_callback(_interaction_done)
+            elif action == "stop":
+                stop_speaking()
+            elif action == "audio_format" and data.get("format") in FORMATS:
+                session.audio_fmt = FORMATS[data["format"]]
+            elif action == "audio_format" and data.get("format") == "none":
+                session.audio_fmt = None
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        connected_clients.discard(websocket)
+        clients.pop(websocket, None)
+        session.close()
         print("Client disconnected.")
 
+def _apply_settings(old, new):
+    global envelope_bands, memory_client, response_cache
+    envelope_bands = new.envelope_bands if new.envelope else None
+    memory_keys = ("memory_url", "memory_cache_ttl_s", "memory_breaker_failures", "memory_breaker_reset_s")
+    if memory_client is not None and any(getattr(old, k) != getattr(new, k) for k in memory_keys):
+        asyncio.create_task(memory_client.aclose())
+        memory_client = None  # rebuilt with the new settings on next use
+    if new.recent_memory_limit != old.recent_memory_limit:
+        scratchpad[:] = scratchpad[-new.recent_memory_limit:]
+    timeline_keys = ("timeline_log", "timeline_log_mb", "timeline_window")
+    if old is new or any(getattr(old, k) != getattr(new, k) for k in timeline_keys):
+        timeline.configure(settings.resolve_path(new.timeline_log), int(new.timeline_log_mb * (1 << 20)),
+                           window=new.timeline_window)
+    cache_keys = ("response_cache", "response_cache_ttl_s", "response_cache_size", "response_cache_disk_mb")
+    if response_cache is not None and any(getattr(old, k) != getattr(new, k) for k in cache_keys):
+        response_cache.close()
+        response_cache = None
+
+def _warm_llm():
+    config = settings.current()
+    llm.warm_up(MODEL_NAME, config.keep_alive, {"num_ctx": config.num_ctx}, timeout=config.startup_timeout_s)
+
 async def main():
-    preload_tts()
-    speaker = asyncio.create_task(speaker_task())
+    global startup_task, audio_player
+    config = settings.current()
+    # models load in the background while the websocket server comes up;
+    # handle_interaction waits for them before going idle
+    asyncio.get_running_loop().set_default_executor(InstrumentedExecutor("default"))
+    monitor = LoopMonitor(config.loop_lag_threshold_ms / 1000).start() if config.loop_lag_threshold_ms else None
+    startup_task = asyncio.create_task(startup.warm_up({"stt": stt.load, "tts": tts.load, "llm": _warm_llm},
+                                                       timeout=config.startup_timeout_s))
+    _apply_settings(config, config)
+    settings.subscribe(_apply_settings)
+    watcher = asyncio.create_task(settings.watch())
     server = await websockets.serve(websocket_handler, "localhost", 8000)
+    metrics_server = await metrics.serve("127.0.0.1", config.metrics_port) if config.metrics_port else None
+    from playback import open_player  # numpy; after the server is listening
+    player = audio_player = open_player(config.audio_output, SAMPLE_RATE)
+    speaker = asyncio.create_task(speaker_task(player))
     print("Elysia is running. WebSocket server on ws://localhost:8000")
     try:
         await asyncio.Future()
@@ -253,8 +745,14 @@ async def main():
     finally:
         await speech_queue.put(None)
         speaker.cancel()
+        watcher.cancel()
+        if monitor is not None:
+            monitor.stop()
+        player.stop()
         server.close()
         await server.wait_closed()
+        if metrics_server is not None:
+            metrics_server.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
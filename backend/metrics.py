@@ -0,0 +1,180 @@
+"""
+In-process metrics: counters, gauges and histograms keyed by name and labels.
+
+snapshot() is a flat dict for logs; exposition() is the Prometheus text
+format, served by serve() on an optional local HTTP port (metrics_port).
+Collectors registered with collect() run just before either, for values
+that are cheaper to read on demand than to keep updated (queue depths,
+executor load, client count).
+"""
+import asyncio
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: Dict[Tuple[str, tuple], object] = {}
+_lock = threading.Lock()
+_collectors: List[Callable[[], None]] = []
+
+
+class Counter:
+    """Monotonic count; exposed with a _total suffix."""
+
+    def __init__(self, name: str, help: str = "", labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self, name: str, help: str = "", labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Histogram:
+    def __init__(self, name: str, help: str = "", labels: tuple = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+
+def _get(cls, name: str, help: str, labels: dict, **kwargs):
+    key = (name, tuple(sorted((labels or {}).items())))
+    with _lock:
+        metric = _registry.get(key)
+        if metric is None:
+            metric = _registry[key] = cls(name, help, key[1], **kwargs)
+    return metric
+
+
+def counter(name: str, help: str = "", labels: dict = None) -> Counter:
+    return _get(Counter, name, help, labels)
+
+
+def gauge(name: str, help: str = "", labels: dict = None) -> Gauge:
+    return _get(Gauge, name, help, labels)
+
+
+def histogram(name: str, help: str = "", labels: dict = None, buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get(Histogram, name, help, labels, buckets=buckets)
+
+
+def collect(callback: Callable[[], None]):
+    """Run callback (which sets gauges) before every snapshot/exposition."""
+    _collectors.append(callback)
+
+
+def _metrics() -> list:
+    for callback in list(_collectors):
+        try:
+            callback()
+        except Exception as e:
+            print(f"[metrics] collector {callback.__name__} failed: {e}")
+    with _lock:
+        return list(_registry.values())
+
+
+def snapshot() -> dict:
+    """Flat {name{labels}: value} view, histograms reported as count/sum."""
+    out = {}
+    metrics = _metrics()
+    for m in metrics:
+        label = ",".join(f"{k}={v}" for k, v in m.labels)
+        key = f"{m.name}{{{label}}}" if label else m.name
+        if isinstance(m, Histogram):
+            out[key + ".count"] = m.count
+            out[key + ".sum"] = round(m.sum, 6)
+        else:
+            out[key] = m.value
+    return out
+
+
+def _labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in labels + extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def exposition() -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    families: Dict[str, list] = {}
+    for m in _metrics():
+        families.setdefault(m.name, []).append(m)
+    lines = []
+    for name in sorted(families):
+        group = families[name]
+        kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(group[0])]
+        family = name + "_total" if kind == "counter" and not name.endswith("_total") else name
+        if group[0].help:
+            lines.append(f"# HELP {family} {group[0].help}")
+        lines.append(f"# TYPE {family} {kind}")
+        for m in sorted(group, key=lambda m: m.labels):
+            if kind != "histogram":
+                lines.append(f"{family}{_labels(m.labels)} {_num(m.value)}")
+                continue
+            with m._lock:
+                counts, count, total = list(m.counts), m.count, m.sum
+            cumulative = 0
+            for bound, n in zip(m.buckets + (math.inf,), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(m.labels, (('le', _num(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(m.labels)} {_num(total)}")
+            lines.append(f"{name}_count{_labels(m.labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+        path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+        if path.split(b"?")[0] == b"/metrics":
+            status, ctype, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", exposition().encode()
+        else:
+            status, ctype, body = "404 Not Found", "text/plain", b"try /metrics\n"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 9108) -> asyncio.AbstractServer:
+    """Minimal HTTP listener for GET /metrics; local scrapes only, no dependencies."""
+    server = await asyncio.start_server(_handle, host, port)
+    print(f"Metrics on http://{host}:{port}/metrics")
+    return server
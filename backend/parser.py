@@ -1,6 +1,5 @@
 import re
 import json
-import yaml  # Optional for YAML fallback
 
 def parse_model_output(raw_output):
     raw_output = ''.join(raw_output).strip() if isinstance(raw_output, list) else raw_output.strip()
@@ -12,7 +11,8 @@ def parse_model_output(raw_output):
     except json.JSONDecodeError as e:
         print(f"JSON decode error: {e} - Trying YAML fallback")
         try:
+            import yaml  # Optional for YAML fallback; only imported when JSON fails
             return yaml.safe_load(raw_output)
-        except yaml.YAMLError:
+        except Exception:  # ImportError or yaml.YAMLError
             print("YAML fallback failed - Raw: {raw_output[:100]}")
             return {"response": raw_output.split('{')[0].strip() if '{' in raw_output else raw_output, "tool_calls": []}
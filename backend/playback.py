@@ -0,0 +1,281 @@
+import asyncio
+import threading
+import time
+import wave
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+
+import metrics
+
+BLOCK_FRAMES = 480  # 20 ms at 24 kHz
+LEVEL_HOLD_BLOCKS = 15  # output_level() covers the last 300 ms: device latency plus the room
+
+
+def to_float32(chunk) -> np.ndarray:
+    """Accepts float32 or PCM16 mono frames."""
+    chunk = np.asarray(chunk)
+    if chunk.dtype == np.int16:
+        return chunk.astype(np.float32) / 32768.0
+    return chunk.astype(np.float32, copy=False).reshape(-1)
+
+
+def to_pcm16(frames: np.ndarray) -> np.ndarray:
+    return (np.clip(frames, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+class RingBuffer:
+    """
+    Single-producer / single-consumer float32 ring. The producer only moves
+    write_pos and the consumer only moves read_pos (both monotonically
+    increasing frame counts), so neither side takes a lock.
+    """
+
+    def __init__(self, capacity: int):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.size = size
+        self._mask = size - 1
+        self._buf = np.zeros(size, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    def available(self) -> int:
+        return self.write_pos - self.read_pos
+
+    def free(self) -> int:
+        return self.size - self.available()
+
+    def write(self, frames: np.ndarray) -> int:
+        n = min(len(frames), self.free())
+        if n <= 0:
+            return 0
+        start = self.write_pos & self._mask
+        first = min(n, self.size - start)
+        self._buf[start:start + first] = frames[:first]
+        self._buf[:n - first] = frames[first:n]
+        self.write_pos += n
+        return n
+
+    def read_into(self, out: np.ndarray) -> int:
+        n = min(len(out), self.available())
+        start = self.read_pos & self._mask
+        first = min(n, self.size - start)
+        out[:first] = self._buf[start:start + first]
+        out[first:n] = self._buf[:n - first]
+        out[n:] = 0.0
+        self.read_pos += n
+        return n
+
+
+class AudioPlayer:
+    """
+    Callback-driven playback. The loop side writes chunks with play(); the
+    sink's audio thread pulls fixed blocks with render(). mark() returns a
+    future that resolves once everything written so far has actually been
+    played, which is what speaker_task waits on before task_done().
+    clear() drops whatever is buffered (barge-in); the audio thread applies
+    it on its next callback, so the ring keeps a single reader.
+    output_level() is the loudness just played, the echo reference for barge-in.
+    """
+
+    def __init__(self, sink: "Sink", sample_rate: int, buffer_s: float = 2.0):
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.ring = RingBuffer(int(sample_rate * buffer_s))
+        self.underruns = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._markers: deque = deque()  # (frame position, future)
+        self._flushes: deque = deque()  # (skip-to position, future), applied by render()
+        self.generation = 0  # bumped by clear(); play() stops writing a chunk from an older one
+        self._block = np.zeros(BLOCK_FRAMES, dtype=np.float32)
+        self._levels = np.zeros(LEVEL_HOLD_BLOCKS, dtype=np.float32)  # RMS per rendered block
+        self._level_i = 0
+        self._underruns = metrics.counter("playback_underruns", "Audio callbacks that ran dry mid-utterance")
+        self._buffered = metrics.gauge("playback_buffered_seconds", "Audio queued ahead of the output device")
+        self._latency = metrics.gauge("playback_output_latency_seconds", "Buffered audio plus device latency")
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.sink.start(self.render, self.sample_rate)
+        return self
+
+    def stop(self):
+        self.sink.stop()
+
+    def render(self, frames: int) -> np.ndarray:
+        """Called on the audio thread; always returns exactly `frames` frames."""
+        out = self._block if frames == BLOCK_FRAMES else np.zeros(frames, dtype=np.float32)
+        while self._flushes:
+            pos, fut = self._flushes.popleft()
+            self.ring.read_pos = max(self.ring.read_pos, pos)
+            self._loop.call_soon_threadsafe(_resolve, fut)
+        got = self.ring.read_into(out)
+        self._levels[self._level_i % LEVEL_HOLD_BLOCKS] = np.sqrt(np.mean(out * out)) if got else 0.0
+        self._level_i += 1
+        if got < frames and self._markers and self._markers[0][0] > self.ring.read_pos:
+            self.underruns += 1
+            self._underruns.inc()
+        while self._markers and self._markers[0][0] <= self.ring.read_pos:
+            _, fut = self._markers.popleft()
+            self._loop.call_soon_threadsafe(_resolve, fut)
+        return out
+
+    async def play(self, chunk):
+        frames = to_float32(chunk)
+        generation = self.generation
+        while len(frames) and generation == self.generation:
+            n = self.ring.write(frames)
+            frames = frames[n:]
+            if len(frames):
+                # full: wait roughly one block for the callback to make room
+                await asyncio.sleep(BLOCK_FRAMES / self.sample_rate)
+        buffered = self.ring.available() / self.sample_rate
+        self._buffered.set(buffered)
+        self._latency.set(buffered + self.sink.latency())
+
+    def output_level(self) -> Optional[float]:
+        """Loudest block played in the last 300 ms in dBFS, or None if that was silence. Any thread."""
+        peak = float(self._levels.max())
+        if peak < 1e-4:
+            return None
+        return 20.0 * np.log10(peak)
+
+    def mark(self, pos: int = None) -> asyncio.Future:
+        """Future resolved once playback passes frame `pos` (default: everything written)."""
+        fut = self._loop.create_future()
+        if pos is None:
+            pos = self.ring.write_pos
+        if pos <= self.ring.read_pos:
+            fut.set_result(None)
+        else:
+            self._markers.append((pos, fut))
+        return fut
+
+    def clear(self) -> asyncio.Future:
+        """Drop all buffered audio. The future resolves once the audio thread has skipped it."""
+        self.generation += 1
+        fut = self._loop.create_future()
+        self._flushes.append((self.ring.write_pos, fut))
+        return fut
+
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class Sink:
+    def start(self, render: Callable[[int], np.ndarray], sample_rate: int):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def latency(self) -> float:
+        return 0.0
+
+
+class PyAudioSink(Sink):
+    def __init__(self):
+        self._pa = None
+        self._stream = None
+
+    def start(self, render, sample_rate):
+        import pyaudio
+        self._pa = pyaudio.PyAudio()
+
+        def callback(in_data, frame_count, time_info, status):
+            return render(frame_count).tobytes(), pyaudio.paContinue
+
+        self._stream = self._pa.open(format=pyaudio.paFloat32, channels=1, rate=sample_rate,
+                                     output=True, frames_per_buffer=BLOCK_FRAMES,
+                                     stream_callback=callback)
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._pa is not None:
+            self._pa.terminate()
+
+    def latency(self) -> float:
+        return self._stream.get_output_latency() if self._stream is not None else 0.0
+
+
+class NullSink(Sink):
+    """Headless sink: pulls blocks on its own thread at real-time pace and discards them."""
+
+    def __init__(self, realtime: bool = True):
+        self.realtime = realtime
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, render, sample_rate):
+        self._thread = threading.Thread(target=self._run, args=(render, sample_rate),
+                                        name="audio-out", daemon=True)
+        self._thread.start()
+
+    def _run(self, render, sample_rate):
+        period = BLOCK_FRAMES / sample_rate
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            self.consume(render(BLOCK_FRAMES))
+            if self.realtime:
+                next_t += period
+                time.sleep(max(0.0, next_t - time.perf_counter()))
+
+    def consume(self, frames: np.ndarray):
+        pass
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+class WavSink(NullSink):
+    """NullSink that also records everything played (silence included) as PCM16 WAV."""
+
+    def __init__(self, path: str, realtime: bool = True):
+        super().__init__(realtime)
+        self.path = path
+        self._wav = None
+
+    def start(self, render, sample_rate):
+        self._wav = wave.open(self.path, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+        super().start(render, sample_rate)
+
+    def consume(self, frames):
+        self._wav.writeframes(to_pcm16(frames).tobytes())
+
+    def stop(self):
+        super().stop()
+        if self._wav is not None:
+            self._wav.close()
+
+
+def make_sink(spec: str) -> Sink:
+    """'device', 'null', or 'wav:<path>' (config key audio_output)."""
+    if spec == "null":
+        return NullSink()
+    if spec.startswith("wav:"):
+        return WavSink(spec[4:])
+    return PyAudioSink()
+
+
+def open_player(spec: str, sample_rate: int) -> AudioPlayer:
+    """A started AudioPlayer on make_sink(spec); falls back to a NullSink when the device won't open."""
+    sink = make_sink(spec)
+    try:
+        return AudioPlayer(sink, sample_rate).start()
+    except Exception as e:
+        sink.stop()
+        print(f"[playback] cannot open audio output {spec!r} ({e}); continuing without local playback")
+        return AudioPlayer(NullSink(), sample_rate).start()
@@ -0,0 +1,120 @@
+"""
+Opt-in per-turn profiling, for catching slowdowns in handle_request,
+clean_for_tts and the tool layer on a running assistant.
+
+    profile_every_n   every Nth turn runs under cProfile and tracemalloc
+                      (ELYSIA_PROFILE_EVERY overrides it without a config edit)
+    profile_slow_ms   every turn is stack-sampled from a side thread, which is
+                      cheap; turns whose time to first audio exceeds this keep
+                      their samples
+
+Files land in profile_dir (relative to the backend directory), named by turn id:
+
+    <turn>.pstats      python -m pstats / snakeviz
+    <turn>.collapsed   flamegraph.pl / speedscope ("frame;frame;frame count")
+    <turn>.alloc.txt   top allocations still live at the end of the turn
+
+All of it covers the event-loop thread, where the turn's own code runs.
+"""
+import cProfile
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+import settings
+
+SAMPLE_INTERVAL = 0.005
+_turns = itertools.count(1)
+
+
+class TurnProfile:
+    def __init__(self, turn_id: str, deterministic: bool, slow_ms: int, out_dir: str):
+        self.turn_id = turn_id
+        self.slow_ms = slow_ms
+        self.out_dir = out_dir
+        self.stacks: Counter = Counter()
+        self.snapshot = None
+        self.peak = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._cprofile = None
+        if deterministic:
+            tracemalloc.start(10)
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if slow_ms:
+            self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._sampler.start()
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        """Stop collecting; call on the loop thread, which the profiler was started on."""
+        self.elapsed = time.perf_counter() - self.started
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self.snapshot = tracemalloc.take_snapshot()
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+
+    def write(self, latency_ms: float) -> list:
+        """Write whatever was collected (sampled stacks only if the turn was slow); returns the paths."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, self.turn_id)
+        paths = []
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(base + ".pstats")
+            paths.append(base + ".pstats")
+            with open(base + ".alloc.txt", "w", encoding="utf-8") as f:
+                f.write(f"turn {self.turn_id}: peak traced {self.peak / 1024:.0f} KiB\n")
+                for stat in self.snapshot.statistics("lineno")[:40]:
+                    f.write(f"{stat}\n")
+            paths.append(base + ".alloc.txt")
+        if self.stacks and (self._cprofile is not None or latency_ms >= self.slow_ms):
+            with open(base + ".collapsed", "w", encoding="utf-8") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(base + ".collapsed")
+        return paths
+
+
+def begin(turn_id: str) -> Optional[TurnProfile]:
+    """Start profiling this turn if it is selected, else None."""
+    config = settings.current()
+    every = int(os.environ.get("ELYSIA_PROFILE_EVERY", config.profile_every_n) or 0)
+    n = next(_turns)
+    deterministic = every > 0 and n % every == 0
+    if not deterministic and not config.profile_slow_ms:
+        return None
+    return TurnProfile(turn_id, deterministic, config.profile_slow_ms, settings.resolve_path(config.profile_dir))
+
+
+def finish(profile: TurnProfile, latency_ms: float):
+    """Write a stopped profile out (blocking file I/O; run it off the loop)."""
+    try:
+        paths = profile.write(latency_ms)
+    except OSError as e:
+        print(f"[profile] could not write profile for {profile.turn_id}: {e}")
+        return
+    if paths:
+        print(f"[profile] {profile.turn_id} ({latency_ms:.0f}ms): {', '.join(paths)}")
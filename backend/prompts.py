@@ -1,3 +1,6 @@
+import re
+from typing import List, Tuple
+
 SYSTEM_PROMPT = """You are Elysia, a local AI assistant running on the user's machine.
 - Use the provided tools to accomplish tasks when appropriate.
 - If a tool call fails, explain the error briefly.
@@ -12,3 +15,53 @@ def format_user_prompt(user_text: str, memory_text: str = "") -> str:
         parts.append(f"Relevant context:\n{memory_text}")
     parts.append(f"User: {user_text}")
     return "\n\n".join(parts)
+
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]|\n")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap stand-in for the model's SentencePiece tokenizer: one token per
+    punctuation mark or newline, and one per ~6 characters of each word.
+    Errs slightly high on English, which is the safe side for a budget.
+    """
+    return sum(1 + (len(p) - 1) // 6 for p in _PIECE_RE.findall(text))
+
+
+def _words(text: str) -> set:
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 2}
+
+
+def rank_snippets(user_text: str, snippets: List[str]) -> List[int]:
+    """Snippet indices, best first: word overlap with the user text, ties to the most recent."""
+    query = _words(user_text)
+    def score(i):
+        words = _words(snippets[i])
+        overlap = len(query & words) / (len(query | words) or 1)
+        return overlap + 0.1 * (i + 1) / len(snippets)
+    return sorted(range(len(snippets)), key=score, reverse=True)
+
+
+def build_prompt(user_text: str, snippets: List[str], budget_tokens: int) -> Tuple[str, dict]:
+    """
+    format_user_prompt() with the memory snippets that fit in budget_tokens,
+    chosen by rank_snippets() and kept in their original order.
+    """
+    base = estimate_tokens(format_user_prompt(user_text, "x")) - 1
+    remaining = budget_tokens - base
+    chosen = []
+    for i in rank_snippets(user_text, snippets):
+        cost = estimate_tokens(snippets[i]) + 1
+        if cost <= remaining:
+            chosen.append(i)
+            remaining -= cost
+    memory_text = "\n".join(snippets[i] for i in sorted(chosen))
+    prompt = format_user_prompt(user_text, memory_text)
+    stats = {
+        "prompt_tokens": estimate_tokens(prompt),
+        "budget_tokens": budget_tokens,
+        "snippets_used": len(chosen),
+        "snippets_dropped": len(snippets) - len(chosen),
+    }
+    return prompt, stats
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+from playback import to_float32, to_pcm16
+
+CACHE_PATH = os.environ.get(
+    "ELYSIA_RESPONSE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache.sqlite"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+  key TEXT PRIMARY KEY,
+  state TEXT NOT NULL,
+  created REAL NOT NULL,
+  used REAL NOT NULL,
+  meta TEXT NOT NULL,
+  audio BLOB NOT NULL
+);
+"""
+
+
+def normalize(text: str) -> str:
+    """Case, punctuation and spacing don't change the question."""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+# words that point back at the previous answer ("why", "tell me more", "do that again")
+_FOLLOW_UP_WORDS = {"yes", "yeah", "yep", "no", "nope", "why", "that", "this", "those", "these", "them",
+                    "they", "he", "she", "him", "her", "more", "again", "else", "also", "continue", "okay", "ok"}
+
+
+def is_follow_up(transcript: str) -> bool:
+    """Short or anaphoric utterances whose answer depends on what was just said."""
+    words = normalize(transcript).split()
+    return len(words) <= 2 or any(w in _FOLLOW_UP_WORDS for w in words)
+
+
+class CachedResponse:
+    def __init__(self, response: str, utterances: List[Tuple[str, list]], state: str, created: float):
+        self.response = response
+        self.utterances = utterances  # [(text, [int16 chunks])], half the size of float32
+        self.state = state
+        self.created = created
+
+    def replay(self) -> List[Tuple[str, list]]:
+        """[(text, [float32 chunks])], ready for the speaker."""
+        return [(text, [to_float32(c) for c in chunks]) for text, chunks in self.utterances]
+
+
+class ResponseCache:
+    """
+    Finished turns (the spoken text and its synthesized audio) keyed by the
+    normalized transcript and the long-term memory it was answered with
+    (plus the last reply, for follow-ups). Two tiers: a
+    small in-memory LRU in front of a SQLite table that survives restarts.
+    Entries expire after ttl_s; the disk tier is trimmed least-recently-used
+    first to max_disk_bytes of audio.
+
+    Each entry records the tool-visible state (workspace fingerprint) it was
+    produced under. A lookup under a different state drops everything, and
+    invalidate() does the same when a tool changes state itself.
+    Methods block on SQLite; call them off the event loop, except invalidate(),
+    which only bumps the generation and leaves the rows to purge().
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl_s: float = 3600.0, max_entries: int = 32,
+                 max_disk_bytes: int = 64 << 20):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.generation = 0  # bumped by invalidate(); a turn that saw it change is not stored
+        self._purged = 0  # generation the tables were last cleared for
+        self._lru: OrderedDict = OrderedDict()  # key -> CachedResponse
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._outcomes = {k: metrics.counter("response_cache_lookups", "Response cache lookups by outcome",
+                                             {"outcome": k})
+                          for k in ("memory", "disk", "miss", "stale")}
+
+    @staticmethod
+    def key(transcript: str, memory_fingerprint: str, last_reply: str = "") -> str:
+        """Standalone questions replay in any conversation; follow-ups only after the same answer."""
+        follow_up = last_reply if is_follow_up(transcript) else ""
+        return hashlib.sha1(f"{normalize(transcript)}\0{memory_fingerprint}\0{follow_up}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str, state: str) -> Optional[CachedResponse]:
+        now = time.time()
+        with self._lock:
+            self._purge_pending()
+            entry = self._lru.get(key)
+            tier = "memory"
+            if entry is None:
+                entry = self._load(key)
+                tier = "disk"
+            if entry is None:
+                self._outcomes["miss"].inc()
+                return None
+            if entry.state != state:
+                # the workspace changed under us: nothing cached is trustworthy
+                self._clear()
+                self._outcomes["stale"].inc()
+                return None
+            if now - entry.created > self.ttl_s:
+                self._lru.pop(key, None)
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self._outcomes["miss"].inc()
+                return None
+            self._remember(key, entry)
+            self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._outcomes[tier].inc()
+            return entry
+
+    def put(self, key: str, state: str, response: str, utterances: List[Tuple[str, list]]):
+        now = time.time()
+        pcm = [(text, [to_pcm16(to_float32(c)) for c in chunks]) for text, chunks in utterances]
+        meta = json.dumps({"response": response,
+                           "utterances": [{"text": t, "chunks": [len(c) for c in cs]} for t, cs in pcm]})
+        audio = b"".join(c.tobytes() for _, cs in pcm for c in cs)
+        entry = CachedResponse(response, pcm, state, now)
+        with self._lock:
+            self._purge_pending()
+            self._remember(key, entry)
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, state, now, now, meta, audio))
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_s,))
+            total = self._db.execute("SELECT COALESCE(SUM(LENGTH(audio)), 0) FROM responses").fetchone()[0]
+            for old_key, size in self._db.execute("SELECT key, LENGTH(audio) FROM responses ORDER BY used").fetchall():
+                if total <= self.max_disk_bytes:
+                    break
+                self._db.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                self._lru.pop(old_key, None)
+                total -= size
+            self._db.commit()
+
+    def invalidate(self):
+        """Safe on the event loop: nothing cached before this is served or stored again."""
+        self.generation += 1
+
+    def purge(self):
+        """Drop what invalidate() retired (get and put do it first if it hasn't run yet)."""
+        with self._lock:
+            self._purge_pending()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _remember(self, key: str, entry: CachedResponse):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _purge_pending(self):
+        generation = self.generation
+        if self._purged != generation:
+            self._clear()
+            self._purged = generation
+
+    def _clear(self):
+        self._lru.clear()
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+
+    def _load(self, key: str) -> Optional[CachedResponse]:
+        row = self._db.execute("SELECT state, created, meta, audio FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        state, created, meta, audio = row
+        meta = json.loads(meta)
+        samples = np.frombuffer(audio, dtype=np.int16)
+        utterances, offset = [], 0
+        for u in meta["utterances"]:
+            chunks = []
+            for n in u["chunks"]:
+                chunks.append(samples[offset:offset + n])
+                offset += n
+            utterances.append((u["text"], chunks))
+        return CachedResponse(meta["response"], utterances, state, created)
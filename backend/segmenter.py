@@ -0,0 +1,179 @@
+import re
+from typing import List, Tuple
+
+# Words that take a trailing "." without ending the sentence.
+TITLES = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "fig", "approx", "dept", "inc", "ltd", "co"}
+# Abbreviations that may also end a sentence; only split if the next word is capitalized.
+SOFT_ABBREVIATIONS = {"etc", "e.g", "i.e", "a.m", "p.m", "u.s", "u.k"}
+# Abbreviations only when a number follows: "No. 5", but "The answer is no."
+NUMBER_ABBREVIATIONS = {"no"}
+
+FENCE = "```"
+_BOUNDARY_RE = re.compile(r"[.!?]+[\"')\]}”’»]*(?=\s)|\n[ \t]*\n")
+_SOFT_SPLIT_RE = re.compile(r"[,;:]\s")
+
+
+class SentenceSegmenter:
+    """
+    Incremental sentence splitter for streamed LLM tokens.
+    feed() returns the sentences completed so far; flush() returns the rest.
+    Code fences are dropped (they are never spoken) and held back while open,
+    so half a block is never handed to TTS.
+    """
+
+    def __init__(self, max_chars: int = 300):
+        self.max_chars = max_chars
+        self._raw = ""      # text not yet checked for fences
+        self._prose = ""    # fence-free text not yet emitted
+        self._in_fence = False
+
+    def feed(self, text: str) -> List[str]:
+        self._raw += text
+        self._strip_fences()
+        return self._split(final=False)
+
+    def flush(self) -> List[str]:
+        # An unterminated fence at the end of a reply is dropped, not spoken.
+        if not self._in_fence:
+            self._prose += self._raw
+        self._raw = ""
+        self._in_fence = False
+        return self._split(final=True)
+
+    def _strip_fences(self):
+        while True:
+            idx = self._raw.find(FENCE)
+            if self._in_fence:
+                if idx < 0:
+                    # keep only what could be the start of the closing fence
+                    self._raw = self._raw[-(len(FENCE) - 1):]
+                    return
+                self._raw = self._raw[idx + len(FENCE):]
+                self._in_fence = False
+                continue
+            if idx < 0:
+                held = len(self._raw) - len(self._raw.rstrip("`"))
+                cut = len(self._raw) - min(held, len(FENCE) - 1)
+                self._prose += self._raw[:cut]
+                self._raw = self._raw[cut:]
+                return
+            self._prose += self._raw[:idx] + " "
+            self._raw = self._raw[idx + len(FENCE):]
+            self._in_fence = True
+
+    def _split(self, final: bool) -> List[str]:
+        out = []
+        start = 0
+        for m in _BOUNDARY_RE.finditer(self._prose):
+            verdict = self._is_boundary(m)
+            if verdict is None:
+                break
+            if not verdict:
+                continue
+            sentence = self._prose[start:m.end()].strip()
+            if sentence:
+                out.append(sentence)
+            start = m.end()
+        self._prose = self._prose[start:]
+
+        while len(self._prose) > self.max_chars:
+            cut = self._soft_cut()
+            out.append(self._prose[:cut].strip())
+            self._prose = self._prose[cut:]
+
+        if final:
+            rest = self._prose.strip()
+            if rest:
+                out.append(rest)
+            self._prose = ""
+        return out
+
+    def _is_boundary(self, m):
+        """True/False for a decided boundary, None if more text is needed."""
+        punct = m.group(0).rstrip("\"')]}”’»")
+        if punct != ".":
+            return True
+        before = self._prose[:m.start()]
+        word = re.search(r"(\S*)$", before).group(1).lstrip("(\"'").lower()
+        if word in TITLES:
+            return False
+        if len(word) == 1 and word.isalpha():
+            return False  # initials: "J. R. R. Tolkien"
+        if word.isdigit():
+            line = before[:len(before) - len(word)].rsplit("\n", 1)[-1]
+            if not line.strip():
+                return False  # numbered list marker: "1. Open the file"
+        if word in NUMBER_ABBREVIATIONS:
+            nxt = self._prose[m.end():].lstrip()
+            if not nxt:
+                return None
+            return not nxt[0].isdigit()
+        if word in SOFT_ABBREVIATIONS:
+            nxt = self._prose[m.end():].lstrip()
+            if not nxt:
+                return None
+            return nxt[0].isupper()
+        return True
+
+    def _soft_cut(self) -> int:
+        window = self._prose[:self.max_chars]
+        cuts = [m.end() for m in _SOFT_SPLIT_RE.finditer(window)]
+        if cuts:
+            return cuts[-1]
+        space = window.rfind(" ")
+        return space + 1 if space > 0 else self.max_chars
+
+
+TOOL_FENCE = "```tool_code"
+
+
+def _partial_suffix(text: str, token: str) -> int:
+    """Length of the longest proper prefix of token that text ends with."""
+    for k in range(min(len(token) - 1, len(text)), 0, -1):
+        if text.endswith(token[:k]):
+            return k
+    return 0
+
+
+class ToolBlockScanner:
+    """
+    Splits a token stream into ("text", prose) and ("tool", body) events,
+    emitting each ```tool_code block as soon as its closing fence arrives.
+    A block still open when the stream ends is dropped, never executed.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._in_tool = False
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        self._buf += text
+        events = []
+        while True:
+            if self._in_tool:
+                idx = self._buf.find(FENCE)
+                if idx < 0:
+                    break
+                events.append(("tool", self._buf[:idx]))
+                self._buf = self._buf[idx + len(FENCE):]
+                self._in_tool = False
+                continue
+            idx = self._buf.find(TOOL_FENCE)
+            if idx < 0:
+                cut = len(self._buf) - _partial_suffix(self._buf, TOOL_FENCE)
+                if cut:
+                    events.append(("text", self._buf[:cut]))
+                self._buf = self._buf[cut:]
+                break
+            if idx:
+                events.append(("text", self._buf[:idx]))
+            self._buf = self._buf[idx + len(TOOL_FENCE):]
+            self._in_tool = True
+        return events
+
+    def flush(self) -> List[Tuple[str, str]]:
+        rest, in_tool = self._buf, self._in_tool
+        self._buf, self._in_tool = "", False
+        if rest and not in_tool:
+            return [("text", rest)]
+        return []
@@ -0,0 +1,54 @@
+import hashlib
+from typing import List, Optional, Tuple
+
+from prompts import estimate_tokens
+
+
+def fingerprint(snippets: List[str]) -> str:
+    return hashlib.sha1("\n".join(snippets).encode("utf-8")).hexdigest()
+
+
+class PromptSession:
+    """
+    Reuses the model's KV cache across turns. Ollama returns the token
+    `context` of each generate call; sending it back with only the new turn
+    as the prompt lets the runner match the cached prefix and prefill just
+    the new tokens. Falls back to a full prompt (and a fresh context) when
+    there is no usable context, when the long-term memory context changed,
+    or when the running context would overflow the token budget.
+    """
+
+    def __init__(self):
+        self.context: Optional[List[int]] = None
+        self.fingerprint: Optional[str] = None
+        self.tool_results: List[str] = []
+
+    def reset(self):
+        self.context = None
+        self.fingerprint = None
+        self.tool_results = []
+
+    def plan(self, user_text: str, full_prompt: str, memory_fingerprint: str,
+             budget_tokens: int) -> Tuple[str, Optional[List[int]], str]:
+        """(prompt, context, mode) for this turn; mode is "session" or "full" with a reason."""
+        if self.context is None:
+            return full_prompt, None, "full:no-context"
+        if memory_fingerprint != self.fingerprint:
+            return full_prompt, None, "full:memory-changed"
+        parts = []
+        if self.tool_results:
+            parts.append("Tool results:\n" + "\n".join(self.tool_results))
+        parts.append(f"User: {user_text}")
+        prompt = "\n\n".join(parts)
+        if len(self.context) + estimate_tokens(prompt) > budget_tokens:
+            return full_prompt, None, "full:context-full"
+        return prompt, self.context, "session"
+
+    def update(self, final_chunk, memory_fingerprint: str, tool_results: List[str]):
+        context = final_chunk.get("context") if final_chunk else None
+        if not context:
+            self.reset()
+            return
+        self.context = list(context)
+        self.fingerprint = memory_fingerprint
+        self.tool_results = list(tool_results)
@@ -0,0 +1,156 @@
+import asyncio
+import dataclasses
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.environ.get("ELYSIA_CONFIG", os.path.join(BACKEND_DIR, "config.json"))
+WATCH_INTERVAL_S = 2.0
+DROP_POLICIES = ("drop_oldest", "drop_newest", "never")  # see clients.ClientSession
+
+
+@dataclass(frozen=True)
+class Settings:
+    tts_voice: str = "af_heart"
+    recent_memory_limit: int = 5
+    stt_model_path: str = "./vosk-model"
+    phone_home: bool = False
+    memory_url: str = ""
+    memory_deadline_s: float = 0.15  # capped at context_deadline_s
+    memory_cache_ttl_s: float = 60.0
+    memory_breaker_failures: int = 3
+    memory_breaker_reset_s: float = 30.0
+    local_memory: bool = False
+    context_deadline_s: float = 0.15
+    num_ctx: int = 4096
+    num_predict: int = 320
+    prompt_headroom: int = 64
+    llm_session: bool = True
+    response_cache: bool = False  # opt in: time-sensitive answers replay until the TTL runs out
+    response_cache_ttl_s: float = 3600.0
+    response_cache_size: int = 32
+    response_cache_disk_mb: float = 64.0
+    keep_alive: str = "30m"
+    startup_timeout_s: float = 120.0  # a loader still running by then is reported FAILED
+    stream_tts: bool = True
+    tts_lookahead: int = 2
+    phrase_cache_mb: float = 16.0
+    phrase_cache_dir: str = "./audio_cache"
+    phrase_cache_max_chars: int = 40
+    audio_output: str = "device"
+    barge_in: bool = False  # opt in once barge_in_echo_margin_db is tuned for the speakers
+    barge_in_margin_db: float = 18.0
+    barge_in_min_ms: int = 240
+    barge_in_echo_margin_db: float = 12.0
+    ws_queue_size: int = 32
+    ws_send_timeout_s: float = 5.0
+    ws_max_audio_backlog_s: float = 30.0
+    ws_drop_policy: dict = field(default_factory=dict)
+    metrics_port: int = 0
+    loop_lag_threshold_ms: int = 100
+    profile_every_n: int = 0  # cProfile + tracemalloc every Nth turn
+    profile_slow_ms: int = 0  # keep sampled stacks of turns slower than this to first audio
+    profile_dir: str = "./profiles"
+    timeline_log: str = "./logs/turns.jsonl"
+    timeline_log_mb: float = 5.0
+    timeline_window: int = 50
+    envelope: bool = True
+    envelope_bands: int = 8
+
+
+_FIELDS = {f.name: f for f in dataclasses.fields(Settings)}
+_current = Settings()
+_mtime = None
+_subscribers: List[Callable[[Settings, Settings], None]] = []
+
+
+def _validate(raw: dict) -> Settings:
+    values = {}
+    for key, value in raw.items():
+        f = _FIELDS.get(key)
+        if f is None:
+            print(f"[settings] ignoring unknown key {key!r}")
+            continue
+        kind = f.type
+        if kind is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise ValueError(f"{key} must be {kind.__name__}, got {value!r}")
+        values[key] = value
+    s = Settings(**values)
+    if s.recent_memory_limit < 0 or s.tts_lookahead < 0 or s.envelope_bands < 0:
+        raise ValueError("recent_memory_limit, tts_lookahead and envelope_bands must be >= 0")
+    if s.envelope_bands > 254:
+        raise ValueError("envelope_bands must be <= 254 (the row width, rms included, is a byte on the wire)")
+    if s.timeline_window < 1 or s.timeline_log_mb <= 0:
+        raise ValueError("timeline_window must be >= 1 and timeline_log_mb > 0")
+    if s.profile_every_n < 0 or s.profile_slow_ms < 0:
+        raise ValueError("profile_every_n and profile_slow_ms must be >= 0 (0 disables)")
+    if s.loop_lag_threshold_ms < 0:
+        raise ValueError("loop_lag_threshold_ms must be >= 0 (0 disables the loop monitor)")
+    if s.phrase_cache_mb < 0 or s.phrase_cache_max_chars < 0:
+        raise ValueError("phrase_cache_mb and phrase_cache_max_chars must be >= 0")
+    if s.response_cache_size < 1 or s.response_cache_disk_mb < 0:
+        raise ValueError("response_cache_size must be >= 1 and response_cache_disk_mb >= 0")
+    bad = {kind: policy for kind, policy in s.ws_drop_policy.items() if policy not in DROP_POLICIES}
+    if bad:
+        raise ValueError(f"ws_drop_policy values must be one of {', '.join(DROP_POLICIES)}, got {bad}")
+    if s.startup_timeout_s <= 0:
+        raise ValueError("startup_timeout_s must be > 0")
+    if s.num_ctx - s.num_predict - s.prompt_headroom < 256:
+        raise ValueError("num_ctx leaves under 256 prompt tokens after num_predict and prompt_headroom")
+    return s
+
+
+def resolve_path(path: str) -> str:
+    """A path from the config: relative ones are under the backend directory, not the CWD. "" stays ""."""
+    return os.path.normpath(os.path.join(BACKEND_DIR, path)) if path else path
+
+
+def current() -> Settings:
+    """The cached settings; never touches the filesystem."""
+    return _current
+
+
+def subscribe(callback: Callable[[Settings, Settings], None]):
+    """callback(old, new) runs after every successful reload that changed something."""
+    _subscribers.append(callback)
+
+
+def reload(force: bool = False) -> bool:
+    """Re-read the file if its mtime changed. A bad file keeps the last good settings."""
+    global _current, _mtime
+    try:
+        mtime = os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError as e:
+        print(f"[settings] cannot stat {CONFIG_PATH}: {e}")
+        return False
+    if mtime == _mtime and not force:
+        return False
+    _mtime = mtime
+    try:
+        with open(CONFIG_PATH, "r") as f:
+            new = _validate(json.load(f))
+    except (OSError, ValueError, TypeError) as e:
+        print(f"[settings] keeping previous config, {CONFIG_PATH} is invalid: {e}")
+        return False
+    old, _current = _current, new
+    if new != old:
+        for callback in list(_subscribers):
+            try:
+                callback(old, new)
+            except Exception as e:
+                print(f"[settings] subscriber {callback.__name__} failed: {e}")
+    return True
+
+
+async def watch(interval: float = WATCH_INTERVAL_S):
+    """Poll the file's mtime; a stat every couple of seconds, off the turn path."""
+    while True:
+        await asyncio.sleep(interval)
+        reload()
+
+
+reload(force=True)
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import metrics
+
+
+class Component:
+    """One cold-start step (a blocking loader) and when it ran."""
+
+    def __init__(self, name: str, load: Callable[[], object]):
+        self.name = name
+        self.load = load
+        self.started_at = 0.0
+        self.done_at = 0.0
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        try:
+            self.load()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done_at = time.perf_counter()
+
+
+async def warm_up(loaders: Dict[str, Callable[[], object]], timeout: float = None) -> Dict[str, Component]:
+    """
+    Run every loader at once, each on its own thread, and wait for all of
+    them. Model loading is mostly native code and disk/network I/O, so the
+    loads overlap and cold start costs roughly the slowest component rather
+    than the sum. A failed loader is reported, not raised: that component
+    loads again on first use. So is one still running after `timeout`
+    (a stalled server): its thread is left to finish or fail on its own.
+    """
+    loop = asyncio.get_running_loop()
+    components = [Component(name, load) for name, load in loaders.items()]
+    t0 = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=max(len(components), 1), thread_name_prefix="warmup")
+    futures = {loop.run_in_executor(pool, c.run): c for c in components}
+    try:
+        _, pending = await asyncio.wait(futures, timeout=timeout)
+    finally:
+        pool.shutdown(wait=False)
+    total = time.perf_counter() - t0
+    for future in pending:
+        c = futures[future]
+        c.error = TimeoutError(f"still loading after {timeout:.0f}s")
+        c.done_at = t0 + total
+
+    parts = []
+    for c in components:
+        seconds = c.done_at - c.started_at
+        metrics.gauge("startup_seconds", "Cold-start load time by component", {"component": c.name}).set(seconds)
+        parts.append(f"{c.name}={seconds * 1000:.0f}ms" + (" FAILED" if c.error else ""))
+        if c.error:
+            print(f"[startup] {c.name} failed to load: {c.error!r}")
+    metrics.gauge("startup_seconds", "Cold-start load time by component", {"component": "total"}).set(total)
+    print(f"[startup] {' '.join(parts)} total={total * 1000:.0f}ms")
+    return {c.name: c for c in components}
@@ -0,0 +1,63 @@
+"""
+Import-time report for the websocket entry point.
+
+    python startup_report.py                 # top 25 modules by cumulative import time
+    python startup_report.py --max-ms 400    # also exit 1 if `import main` takes longer
+    python startup_report.py --module stt --top 10
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter
+and sorts its stderr. Heavy dependencies (torch/kokoro, vosk, pyaudio,
+numpy, httpx, yaml) are imported on first use or by the startup warm-up,
+so any of them showing up here is a regression; --max-ms is the gate for
+watchdog restarts.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY = ("torch", "kokoro", "vosk", "pyaudio", "numpy", "httpx", "yaml", "requests")
+
+
+def import_times(module: str):
+    """[(name, self_us, cumulative_us)] from a fresh interpreter importing `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--module", default="main")
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--max-ms", type=float, default=None, help="fail if the module's import exceeds this")
+    args = ap.parse_args()
+
+    rows = import_times(args.module)
+    total_ms = next((cum for name, _, cum in rows if name == args.module), 0) / 1000
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cum_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+    heavy = sorted({name.split(".")[0] for name, _, _ in rows} & set(HEAVY))
+    print(f"\nimport {args.module}: {total_ms:.1f}ms, {len(rows)} modules")
+    if heavy:
+        print(f"heavy modules imported eagerly: {', '.join(heavy)}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"FAIL: {total_ms:.1f}ms > --max-ms {args.max_ms:.0f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
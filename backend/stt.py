@@ -1,23 +1,36 @@
-from vosk import Model, KaldiRecognizer
-import pyaudio
 import json
-import os
+import threading
+import time
 
-config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-with open(config_path, 'r') as f:
-    config = json.load(f)
+import settings
 
-model = Model(config['stt_model_path'])
-rec = KaldiRecognizer(model, 16000)
+_rec = None
+_lock = threading.Lock()
+last_speech_end = 0.0  # perf_counter() when Vosk finalized the last utterance: the turn's zero point
 
-def listen():
+def load():
+    """Load the Vosk model and recognizer on first use. Idempotent."""
+    global _rec
+    with _lock:
+        if _rec is None:
+            from vosk import Model, KaldiRecognizer
+            model = Model(settings.current().stt_model_path)
+            _rec = KaldiRecognizer(model, 16000)
+    return _rec
+
+def listen(preroll: bytes = b""):
+    """Block until Vosk hears an utterance. preroll is audio already captured (barge-in) to decode first."""
+    global last_speech_end
+    import pyaudio
+    rec = load()
     p = pyaudio.PyAudio()
     stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
     stream.start_stream()
     print("Listening...")
+    data = preroll
     while True:
-        data = stream.read(4000)
-        if rec.AcceptWaveform(data):
+        if data and rec.AcceptWaveform(data):
+            last_speech_end = time.perf_counter()
             result = json.loads(rec.Result())
             text = result.get('text', '')
             if text:
@@ -26,3 +39,4 @@ def listen():
                 stream.close()
                 p.terminate()
                 return text
+        data = stream.read(4000)
@@ -0,0 +1,173 @@
+"""
+Per-turn latency timelines.
+
+Every turn gets an id and the offsets (from the end of the user's speech)
+of the first occurrence of each named point in the pipeline:
+
+    speech_end          Vosk returned a final result (stt.listen)
+    context_ready       memory/scratchpad context assembled
+    prompt_sent         generate request issued
+    first_token         first LLM token arrived
+    first_sentence      first sentence queued for speech
+    first_audio_chunk   first audio chunk synthesized
+    first_audio_played  first audio frame left the output buffer
+    turn_complete       last frame played
+
+plus non-timing notes (prompt size, cache outcome, ...). Finished turns are
+kept for p50/p95 summaries and appended to a size-rotated JSONL log; each
+record carries the host name so logs from several devices can be pooled:
+
+    python backend/timeline.py logs/turns.jsonl [more.jsonl ...] --last 200
+"""
+import argparse
+import itertools
+import json
+import logging
+import logging.handlers
+import math
+import os
+import socket
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional
+
+HOST = socket.gethostname()
+_boot = format(int(time.time()) & 0xFFFFFF, "06x")
+_ids = itertools.count(1)
+
+
+class TurnTimeline:
+    """Offsets (seconds since turn start) of the first occurrence of each named event, plus notes."""
+
+    def __init__(self, t0: float = None):
+        now = time.perf_counter()
+        self.turn_id = f"{_boot}-{next(_ids)}"
+        self.t0 = t0 if t0 else now
+        self.started_at = time.time() - (now - self.t0)
+        self.marks: Dict[str, float] = {}
+        self.info: Dict[str, object] = {}
+
+    def mark(self, name: str, at: float = None):
+        """Record `name` now, or at an earlier perf_counter() time taken on another thread."""
+        self.marks.setdefault(name, (at if at else time.perf_counter()) - self.t0)
+
+    def summary(self) -> str:
+        parts = [f"{k}={v * 1000:.0f}ms" for k, v in self.marks.items()]
+        parts += [f"{k}={v}" for k, v in self.info.items()]
+        return " ".join(parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "turn_id": self.turn_id,
+            "host": HOST,
+            "started_at": round(self.started_at, 3),
+            "marks_ms": {k: round(v * 1000, 1) for k, v in self.marks.items()},
+            "info": self.info,
+        }
+
+
+current: Optional[TurnTimeline] = None
+recent: deque = deque(maxlen=50)
+_log: Optional[logging.Logger] = None
+
+
+def configure(path: str = "", max_bytes: int = 5 << 20, backups: int = 3, window: int = 50):
+    """Where finished turns are logged ("" = nowhere) and how many feed the percentiles."""
+    global _log, recent
+    if window != recent.maxlen:
+        recent = deque(recent, maxlen=window)
+    log = logging.getLogger("elysia.turns")
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+        handler.close()
+    _log = None
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        _log = log
+
+
+def start_turn(t0: float = None) -> TurnTimeline:
+    """t0: perf_counter() of the end of the user's speech, when known."""
+    global current
+    current = TurnTimeline(t0)
+    if t0:
+        current.mark("speech_end", t0)
+    return current
+
+
+def mark(name: str, at: float = None):
+    if current is not None:
+        current.mark(name, at)
+
+
+def note(key: str, value):
+    """Attach a non-timing fact (e.g. prompt size) to the current turn."""
+    if current is not None:
+        current.info[key] = value
+
+
+def finish_turn() -> Optional[TurnTimeline]:
+    global current
+    turn = current
+    if turn is None:
+        return None
+    turn.mark("turn_complete")
+    recent.append(turn)
+    print(f"[timing] {turn.turn_id} {turn.summary()}")
+    if _log is not None:
+        try:
+            _log.info(json.dumps(turn.to_dict(), default=str))
+        except Exception as e:
+            print(f"[timing] could not write turn log: {e}")
+    current = None
+    return turn
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)  # nearest rank
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def percentiles(turns: Iterable[dict] = None) -> Dict[str, dict]:
+    """{mark: {"p50", "p95", "n"}} in ms over `turns` (to_dict() records), default the recent window."""
+    if turns is None:
+        turns = [t.to_dict() for t in recent]
+    values = defaultdict(list)
+    for turn in turns:
+        for name, ms in turn["marks_ms"].items():
+            values[name].append(ms)
+    return {name: {"p50": _percentile(v, 0.50), "p95": _percentile(v, 0.95), "n": len(v)}
+            for name, v in values.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="p50/p95 per timeline mark from turn logs, per host.")
+    ap.add_argument("paths", nargs="+", help="turns.jsonl files (rotated .1/.2 files too)")
+    ap.add_argument("--last", type=int, default=0, help="only the last N turns of each host")
+    args = ap.parse_args()
+    by_host = defaultdict(list)
+    for path in args.paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    by_host[record.get("host", "?")].append(record)
+    for host, turns in sorted(by_host.items()):
+        turns.sort(key=lambda r: r["started_at"])
+        if args.last:
+            turns = turns[-args.last:]
+        print(f"\n{host}: {len(turns)} turns")
+        print(f"  {'mark':<22}{'p50 ms':>10}{'p95 ms':>10}{'n':>6}")
+        stats = percentiles(turns)
+        for name, s in sorted(stats.items(), key=lambda kv: kv[1]["p50"]):
+            print(f"  {name:<22}{s['p50']:>10.0f}{s['p95']:>10.0f}{s['n']:>6}")
+
+
+if __name__ == "__main__":
+    main()
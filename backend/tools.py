@@ -142,6 +142,24 @@ def find_file(name: str, limit: int = 5) -> str:
     except Exception as e:
         return f"ERROR: {type(e).__name__}: {e}"
 
+def workspace_fingerprint(limit: int = 5000) -> str:
+    """Cheap digest of WORKDIR (names, sizes, mtimes); changes whenever a tool would see something new."""
+    import hashlib
+    h = hashlib.sha1()
+    seen = 0
+    for root, dirs, files in os.walk(WORKDIR):
+        dirs.sort()
+        for f in sorted(files):
+            try:
+                st = os.stat(os.path.join(root, f))
+            except OSError:
+                continue
+            h.update(f"{os.path.relpath(os.path.join(root, f), WORKDIR)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+            seen += 1
+            if seen >= limit:
+                return h.hexdigest()
+    return h.hexdigest()
+
 class MacroStore:
     def __init__(self, path: str = MACRO_PATH):
         self.path = path
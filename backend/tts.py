@@ -1,27 +1,94 @@
-from kokoro import KPipeline
-import numpy as np
-import torch
-import json
-import os
-
-config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-with open(config_path, 'r') as f:
-    config = json.load(f)
-
-pipeline = KPipeline(lang_code='a')
-
-def preload_tts():
-    print("Pre-loading TTS model...")
-    try:
-        _ = list(pipeline(" ", voice=config['tts_voice']))
-        print("TTS model loaded successfully.")
-    except Exception as e:
-        print(f"Could not pre-load TTS model: {e}")
-
-def generate_audio_chunks(text):
-    generator = pipeline(text, voice=config['tts_voice'])
+import threading
+import time
+
+import metrics
+import settings
+
+SAMPLE_RATE = 24000  # Kokoro output rate
+
+_pipeline = None
+_lock = threading.Lock()
+_phrases = None  # audio_cache.PhraseCache, built on first use
+_version = None
+_rtf = metrics.histogram("tts_real_time_factor", "Synthesis time / audio duration per phrase (<1 is faster than real time)",
+                         buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0))
+
+def load():
+    """Build the Kokoro pipeline (importing torch/kokoro) and warm the current voice. Idempotent."""
+    global _pipeline
+    with _lock:
+        if _pipeline is None:
+            from kokoro import KPipeline
+            pipeline = KPipeline(lang_code='a')
+            _ = list(pipeline(" ", voice=settings.current().tts_voice))
+            _pipeline = pipeline
+    return _pipeline
+
+def pipeline_version() -> str:
+    """Part of every phrase-cache key: new Kokoro weights or code must not replay old audio."""
+    global _version
+    if _version is None:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            kokoro = version("kokoro")
+        except PackageNotFoundError:
+            kokoro = "unknown"
+        _version = f"kokoro-{kokoro}/a/{SAMPLE_RATE}"
+    return _version
+
+def _phrase_cache():
+    global _phrases
+    config = settings.current()
+    if config.phrase_cache_max_chars <= 0:
+        return None
+    if _phrases is None:
+        from audio_cache import PhraseCache
+        _phrases = PhraseCache(
+            max_bytes=int(config.phrase_cache_mb * (1 << 20)),
+            disk_dir=settings.resolve_path(config.phrase_cache_dir),
+            max_chars=config.phrase_cache_max_chars)
+    return _phrases
+
+def generate_audio_chunks(text, persist: bool = False):
+    import numpy as np
+    voice = settings.current().tts_voice
+    cache = _phrase_cache()
+    key = None
+    if cache is not None and cache.accepts(text):
+        key = cache.key(voice, text, pipeline_version())
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+    import torch
+    chunks = []
+    synth_s, samples = 0.0, 0
+    generator = load()(text, voice=voice)
+    t = time.perf_counter()
     for _, _, audio in generator:
         if isinstance(audio, torch.Tensor):
             audio = audio.cpu().numpy()
         chunk = audio.astype(np.float32)
+        synth_s += time.perf_counter() - t  # excludes time spent blocked on the consumer
+        samples += len(chunk)
+        if key is not None:
+            chunks.append(chunk)
         yield chunk
+        t = time.perf_counter()
+    if samples:
+        _rtf.observe(synth_s / (samples / SAMPLE_RATE))
+    if key is not None:
+        # only reached when the phrase was synthesized to the end, never for a cancelled one
+        cache.put(key, chunks, persist)
+
+def _on_settings(old, new):
+    global _phrases
+    if new.tts_voice != old.tts_voice and _pipeline is not None:
+        # load the new voice off-thread so the next sentence doesn't pay for it
+        print(f"TTS voice -> {new.tts_voice}")
+        threading.Thread(target=_pipeline.load_voice, args=(new.tts_voice,), daemon=True).start()
+    phrase_keys = ("phrase_cache_mb", "phrase_cache_dir", "phrase_cache_max_chars")
+    if any(getattr(old, k) != getattr(new, k) for k in phrase_keys):
+        _phrases = None  # rebuilt with the new limits on next use
+
+settings.subscribe(_on_settings)
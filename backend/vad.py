@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+
+RATE = 16000
+FRAME = 320  # 20 ms at 16 kHz
+PREROLL_FRAMES = 25  # 500 ms handed to the next listen() so the first words aren't lost
+
+
+class EnergyVAD:
+    """
+    Frame-energy voice activity detector with an adaptive noise floor.
+
+    A frame is speech when it is margin_db above the floor (and above
+    min_db). The floor follows quiet frames quickly and loud ones very
+    slowly, so steady background noise gets absorbed. It triggers once
+    speech has lasted min_ms; non-speech frames count the run down instead
+    of resetting it, which bridges the gaps between syllables.
+
+    The floor alone cannot absorb Elysia's own voice coming back from the
+    speakers: it is loud and starts abruptly. So while she is playing,
+    process() takes the output level as a reference. Bleed keeps a roughly
+    fixed ratio to it (the echo path), which is tracked like the floor, and
+    a frame only counts as speech if it is echo_margin_db above that ratio.
+    """
+
+    def __init__(self, margin_db: float = 18.0, min_ms: int = 240, min_db: float = -50.0,
+                 frame_ms: float = FRAME * 1000 / RATE, echo_margin_db: float = 12.0):
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.echo_margin_db = echo_margin_db
+        self.need = max(1, round(min_ms / frame_ms))
+        self.floor: Optional[float] = None
+        self.echo: Optional[float] = None  # mic level minus output level, for bleed
+        self.run = 0
+
+    def level(self, frame: bytes) -> float:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        rms = np.sqrt(np.mean(samples * samples)) if len(samples) else 0.0
+        return 20.0 * np.log10(max(rms, 1.0) / 32768.0)
+
+    def process(self, frame: bytes, reference_db: float = None) -> bool:
+        """reference_db: what the speakers are playing (dBFS), None when silent."""
+        db = self.level(frame)
+        if self.floor is None:
+            self.floor = db
+        speech = db > self.floor + self.margin_db and db > self.min_db
+        self.floor += (0.002 if speech or db > self.floor else 0.05) * (db - self.floor)
+        if reference_db is not None and db > self.min_db:
+            ratio = db - reference_db
+            if self.echo is None:
+                self.echo = ratio
+            speech = speech and ratio > self.echo + self.echo_margin_db
+            self.echo += (0.002 if speech or ratio > self.echo else 0.05) * (ratio - self.echo)
+        self.run = self.run + 1 if speech else max(0, self.run - 1)
+        return self.run >= self.need
+
+
+class BargeInDetector:
+    """
+    Listens on the microphone (its own thread) while Elysia is thinking or
+    speaking. `triggered` is set on the event loop the moment the VAD fires;
+    `triggered_at` is the perf_counter of the frame that fired, the zero
+    point for cancellation latency. After a trigger it keeps recording until
+    closed, and preroll() (500 ms before the trigger plus everything since)
+    is fed to the listen() that follows, so no words fall in the gap.
+    `reference` returns the current playback level for the VAD's echo gate.
+    """
+
+    def __init__(self, vad: EnergyVAD, reference: Callable[[], Optional[float]] = None):
+        self.vad = vad
+        self.reference = reference
+        self.triggered = asyncio.Event()
+        self.triggered_at = 0.0
+        self._loop = asyncio.get_running_loop()
+        self._stop = threading.Event()
+        self._frames: deque = deque(maxlen=PREROLL_FRAMES)
+        self._after = []
+        self._thread = threading.Thread(target=self._run, name="barge-in", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    async def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            await self._loop.run_in_executor(None, self._thread.join, 0.5)
+
+    def preroll(self) -> bytes:
+        return b"".join(self._frames) + b"".join(self._after)
+
+    def _open(self):
+        import pyaudio
+        p = pyaudio.PyAudio()
+        stream = p.open(format=pyaudio.paInt16, channels=1, rate=RATE, input=True, frames_per_buffer=FRAME)
+        return p, stream
+
+    def _run(self):
+        try:
+            p, stream = self._open()
+        except Exception as e:
+            print(f"[barge-in] microphone unavailable, barge-in disabled for this turn: {e}")
+            return
+        try:
+            while not self._stop.is_set():
+                frame = stream.read(FRAME, exception_on_overflow=False)
+                if self.triggered_at:
+                    self._after.append(frame)
+                    continue
+                self._frames.append(frame)
+                if self.vad.process(frame, self.reference() if self.reference else None):
+                    self.triggered_at = time.perf_counter()
+                    self._loop.call_soon_threadsafe(self.triggered.set)
+        finally:
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
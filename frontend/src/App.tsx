@@ -2,6 +2,13 @@ import React, { useEffect, useState, useRef, useCallback } from 'react';
 import VoxWaveform from './VoxWaveform';
 import Avatar from './Avatar';
 import { AvatarEvent } from './types';
+import { EnvelopeTrack } from './envelope';
+
+// Browser playback is opt-in (?audio=pcm16 or ?audio=float32): the backend plays through
+// its own speakers, so set audio_output to "null" in backend/config.json when listening here.
+const browserAudio = new URLSearchParams(window.location.search).get('audio');
+// Without it the backend sends each chunk's envelope as that chunk starts playing, so it is drawn on arrival.
+const clockNow = () => performance.now() / 1000;
 
 const App: React.FC = () => {
   const [state, setState] = useState<AvatarEvent>('idle');
@@ -9,64 +16,112 @@ const App: React.FC = () => {
   const [phoneHome, setPhoneHome] = useState(false);  // New: UI toggle
 
   const audioContextRef = useRef<AudioContext | null>(null);
-  const analyserRef = useRef<AnalyserNode | null>(null);
-  const sourceRef = useRef<MediaStreamAudioSourceNode | null>(null);
   const wsRef = useRef<WebSocket | null>(null);
-  const audioQueueRef = useRef<AudioBufferSourceNode[]>([]);
+  const audioQueueRef = useRef<{ node: AudioBufferSourceNode; seq: number }[]>([]);
+  const envelopeRef = useRef(new EnvelopeTrack());
   const isPlayingRef = useRef<boolean>(false);
-  const micStreamRef = useRef<MediaStream | null>(null);
+  const playingNodeRef = useRef<AudioBufferSourceNode | null>(null);
+
+  const speechEnvelope = useCallback(
+    () => envelopeRef.current.levelAt(browserAudio ? audioContextRef.current?.currentTime ?? 0 : clockNow()),
+    []
+  );
+  const speechLevel = useCallback(() => speechEnvelope().rms, [speechEnvelope]);
 
   const playNextInQueue = useCallback(() => {
     if (isPlayingRef.current || audioQueueRef.current.length === 0) return;
     isPlayingRef.current = true;
-    const sourceNode = audioQueueRef.current.shift();
-    if (sourceNode && audioContextRef.current) {
+    const item = audioQueueRef.current.shift();
+    if (item && audioContextRef.current) {
+      const sourceNode = item.node;
       sourceNode.onended = () => {
+        if (playingNodeRef.current !== sourceNode) return;  // flushed
+        playingNodeRef.current = null;
         isPlayingRef.current = false;
         playNextInQueue();
       };
-      sourceNode.connect(analyserRef.current!);
+      playingNodeRef.current = sourceNode;
       sourceNode.connect(audioContextRef.current.destination);
       sourceNode.start();
+      envelopeRef.current.start(item.seq, audioContextRef.current.currentTime);
     } else {
       isPlayingRef.current = false;
     }
   }, []);
 
+  // Barge-in: the backend stopped speaking, so drop queued audio and cut the current chunk.
+  const flushAudio = useCallback(() => {
+    audioQueueRef.current = [];
+    const node = playingNodeRef.current;
+    playingNodeRef.current = null;
+    isPlayingRef.current = false;
+    node?.stop();
+    envelopeRef.current.clear();
+  }, []);
+
   useEffect(() => {
     audioContextRef.current = new AudioContext();
-    analyserRef.current = audioContextRef.current.createAnalyser();
-    analyserRef.current.fftSize = 2048;
 
-    navigator.mediaDevices.getUserMedia({ audio: true })
-      .then(stream => {
-        micStreamRef.current = stream;
-        sourceRef.current = audioContextRef.current!.createMediaStreamSource(stream);
-        sourceRef.current.connect(analyserRef.current!);
-      })
-      .catch(err => console.error('Mic access error:', err));
+    const enqueueAudio = (samples: Float32Array, sampleRate: number, seq = -1) => {
+      if (!audioContextRef.current) return;
+      const buffer = audioContextRef.current.createBuffer(1, samples.length, sampleRate);
+      buffer.copyToChannel(samples, 0);
+      const sourceNode = audioContextRef.current.createBufferSource();
+      sourceNode.buffer = buffer;
+      audioQueueRef.current.push({ node: sourceNode, seq });
+      playNextInQueue();
+    };
 
     wsRef.current = new WebSocket('ws://localhost:8000');
+    wsRef.current.binaryType = 'arraybuffer';
     wsRef.current.onmessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        // Binary TTS frame, see backend/audio_protocol.py: 16-byte header + samples
+        const view = new DataView(event.data);
+        const kind = view.getUint8(5);
+        const fmt = view.getUint8(6);
+        const seq = view.getUint32(8, true);
+        const rate = view.getUint32(12, true);
+        if (kind === 2) {
+          // envelope rows for the audio frame with the same seq; fmt = row width
+          envelopeRef.current.add(seq, new Uint8Array(event.data, 16), fmt, rate);
+          if (!browserAudio) envelopeRef.current.start(seq, clockNow());
+          return;
+        }
+        if (kind !== 1) return;
+        let samples: Float32Array;
+        if (fmt === 1) {
+          const pcm = new Int16Array(event.data, 16);
+          samples = new Float32Array(pcm.length);
+          for (let i = 0; i < pcm.length; i++) samples[i] = pcm[i] / 32768;
+        } else {
+          samples = new Float32Array(event.data.slice(16));
+        }
+        enqueueAudio(samples, rate, seq);
+        return;
+      }
       const data = JSON.parse(event.data);
+      if (data.flush_audio) flushAudio();
+      if (data.type === 'metrics') {
+        // per-turn latency timeline + rolling p50/p95, see backend/timeline.py
+        console.debug('turn', data.turn?.turn_id, data.turn?.marks_ms, data.summary);
+        return;
+      }
       if (data.type) setState(data.type as AvatarEvent);  // Fixed to match backend broadcast
       if (data.response) setResponse(prev => prev + data.response + '\n');
       if (data.tool_result) setResponse(prev => prev + '\n' + data.tool_result);
 
       if (data.audio_chunk) {
-        if (!audioContextRef.current) return;
-        const chunk = new Float32Array(data.audio_chunk);
-        const buffer = audioContextRef.current.createBuffer(1, chunk.length, 24000);  // Assume 24kHz—match Kokoro
-        buffer.copyToChannel(chunk, 0);
-        const sourceNode = audioContextRef.current.createBufferSource();
-        sourceNode.buffer = buffer;
-        audioQueueRef.current.push(sourceNode);
-        playNextInQueue();
+        enqueueAudio(new Float32Array(data.audio_chunk), 24000);  // Assume 24kHz—match Kokoro
       }
     };
 
     wsRef.current.onopen = () => {
       setResponse('');
+      if (browserAudio) {
+        const format = browserAudio === 'float32' ? 'float32' : 'pcm16';
+        wsRef.current!.send(JSON.stringify({ action: 'audio_format', format }));
+      }
       wsRef.current!.send(JSON.stringify({ action: 'start' }));
     };
 
@@ -76,9 +131,8 @@ const App: React.FC = () => {
     return () => {
       wsRef.current?.close();
       audioContextRef.current?.close();
-      micStreamRef.current?.getTracks().forEach(track => track.stop());
     };
-  }, [playNextInQueue]);
+  }, [playNextInQueue, flushAudio]);
 
   const togglePhoneHome = () => {
     const newVal = !phoneHome;
@@ -96,8 +150,8 @@ const App: React.FC = () => {
       textAlign: 'center',
       padding: '20px'
     }}>
-      <Avatar event={state} />
-      <VoxWaveform analyser={analyserRef.current} state={state} />
+      <Avatar event={state} level={speechLevel} />
+      <VoxWaveform level={speechEnvelope} state={state} />
       <p style={{ whiteSpace: 'pre-wrap', maxWidth: '600px' }}>{response}</p>
       <button onClick={togglePhoneHome} style={{ marginTop: '20px', padding: '10px' }}>
         {phoneHome ? 'Disable' : 'Enable'} Phone-Home Memory
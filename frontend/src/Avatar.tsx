@@ -3,9 +3,10 @@ import { AvatarEvent } from './types';
 
 interface Props {
   event: AvatarEvent;
+  level?: () => number;  // 0..1 speech level from the backend envelope
 }
 
-const Avatar: React.FC<Props> = ({ event }) => {
+const Avatar: React.FC<Props> = ({ event, level }) => {
   const [scale, setScale] = useState(1);
   let emoji = '😊';
   switch (event) {
@@ -19,12 +20,13 @@ const Avatar: React.FC<Props> = ({ event }) => {
   useEffect(() => {
     if (event === 'speaking' || event === 'listening') {
       const interval = setInterval(() => {
-        setScale(1 + Math.random() * 0.1);
-      }, 100);
+        const v = event === 'speaking' && level ? level() : Math.random();
+        setScale(1 + v * 0.1);
+      }, event === 'speaking' && level ? 40 : 100);
       return () => clearInterval(interval);
     }
     setScale(1);
-  }, [event]);
+  }, [event, level]);
 
   return (
     <div style={{ fontSize: '100px', transition: 'transform 0.1s ease-in-out', transform: `scale(${scale})` }}>
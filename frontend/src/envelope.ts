@@ -0,0 +1,47 @@
+// Lip-sync envelope frames precomputed by the backend (audio_protocol.py, KIND_ENVELOPE).
+// Each row is [rms, band_0 .. band_n] as 0..255 over a 60 dB range, `fps` rows per second.
+
+export interface EnvelopeLevel {
+  rms: number;      // 0..1
+  bands: number[];  // 0..1 each
+}
+
+interface Envelope {
+  rows: Uint8Array;
+  width: number;
+  fps: number;
+}
+
+const SILENT: EnvelopeLevel = { rms: 0, bands: [] };
+
+export class EnvelopeTrack {
+  private pending = new Map<number, Envelope>();
+  private current: (Envelope & { startTime: number }) | null = null;
+
+  add(seq: number, rows: Uint8Array, width: number, fps: number) {
+    this.pending.set(seq, { rows, width, fps });
+  }
+
+  // Call when the audio chunk with the same seq starts playing (or, without browser audio, on arrival).
+  start(seq: number, startTime: number) {
+    const env = this.pending.get(seq);
+    this.pending.delete(seq);
+    this.current = env ? { ...env, startTime } : null;
+  }
+
+  clear() {
+    this.pending.clear();
+    this.current = null;
+  }
+
+  levelAt(time: number): EnvelopeLevel {
+    const env = this.current;
+    if (!env) return SILENT;
+    const row = Math.floor((time - env.startTime) * env.fps);
+    if (row < 0 || (row + 1) * env.width > env.rows.length) return SILENT;
+    const offset = row * env.width;
+    const bands: number[] = [];
+    for (let i = 1; i < env.width; i++) bands.push(env.rows[offset + i] / 255);
+    return { rms: env.rows[offset] / 255, bands };
+  }
+}